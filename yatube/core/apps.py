@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_finished
+        from django.db.backends.signals import connection_created
+
+        from . import db, querylog
+
+        connection_created.connect(
+            db.apply_sqlite_pragmas, dispatch_uid='core.db.sqlite_pragmas')
+        if settings.QUERY_LOG_ENABLED:
+            connection_created.connect(
+                querylog.install, dispatch_uid='core.querylog.install')
+            request_finished.connect(
+                querylog.flush_if_due,
+                dispatch_uid='core.querylog.flush_if_due')
@@ -0,0 +1,170 @@
+"""Бэкенды кэша и защита от «набега» на пустой ключ.
+
+Настройка CACHES собирается в settings из переменных окружения:
+по умолчанию это общий для всех воркеров файловый кэш, для нескольких
+машин — memcached. LocMemCache остаётся для разработки.
+"""
+import os
+import pickle
+import tempfile
+import time
+import zlib
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends import filebased, locmem, memcached
+from django.core.files.move import file_move_safe
+
+from . import metrics
+
+
+DEFAULT_COMPRESS_MIN_LENGTH = 1024
+
+_MISSING = object()
+
+
+class CompressedValue:
+    """Обёртка для сжатого значения в кэше."""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class CompressedCacheMixin:
+    """Сжимает zlib значения длиннее OPTIONS['COMPRESS_MIN_LENGTH'] байт.
+
+    Отрендеренная страница ленты занимает десятки килобайт и хорошо
+    сжимается, а память memcached и LocMemCache не бесконечна.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        self.compress_min_length = options.pop(
+            'COMPRESS_MIN_LENGTH', DEFAULT_COMPRESS_MIN_LENGTH)
+        params['OPTIONS'] = options
+        super().__init__(location, params)
+
+    def _compress(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) < self.compress_min_length:
+            return value
+        return CompressedValue(zlib.compress(data))
+
+    def _decompress(self, value):
+        if isinstance(value, CompressedValue):
+            return pickle.loads(zlib.decompress(value.data))
+        return value
+
+    def get(self, key, default=None, version=None):
+        return self._decompress(super().get(key, default, version))
+
+    def get_many(self, keys, version=None):
+        return {
+            key: self._decompress(value)
+            for key, value in super().get_many(keys, version).items()
+        }
+
+    def set(self, key, value, *args, **kwargs):
+        return super().set(key, self._compress(value), *args, **kwargs)
+
+    def add(self, key, value, *args, **kwargs):
+        return super().add(key, self._compress(value), *args, **kwargs)
+
+    def set_many(self, data, *args, **kwargs):
+        data = {key: self._compress(value) for key, value in data.items()}
+        return super().set_many(data, *args, **kwargs)
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи get()/get_many() в метрики запроса."""
+
+    def get(self, key, default=None, version=None):
+        started = time.perf_counter()
+        value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        metrics.record_cache(
+            int(hit), int(not hit), time.perf_counter() - started)
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        started = time.perf_counter()
+        # BaseCache.get_many() вызывает get() для каждого ключа, их не
+        # нужно считать второй раз.
+        token = metrics.activate(None)
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            metrics.deactivate(token)
+        metrics.record_cache(
+            len(found), len(keys) - len(found),
+            time.perf_counter() - started)
+        return found
+
+
+class CompressedLocMemCache(InstrumentedCacheMixin, CompressedCacheMixin,
+                            locmem.LocMemCache):
+    pass
+
+
+class CompressedMemcachedCache(InstrumentedCacheMixin, CompressedCacheMixin,
+                               memcached.MemcachedCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, filebased.FileBasedCache):
+    """Файловый кэш с атомарным add().
+
+    Значения FileBasedCache и так сжимает zlib. Стандартный add() —
+    это has_key() + set(), и два воркера могут оба «взять» блокировку;
+    здесь файл появляется через os.link, который не перезаписывает
+    существующий файл.
+    """
+
+    def add(self, key, value, timeout=filebased.DEFAULT_TIMEOUT,
+            version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        if self.has_key(key, version):
+            return False
+        # has_key() удаляет просроченный файл, так что здесь его уже нет.
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            try:
+                os.link(tmp_path, fname)
+            except FileExistsError:
+                return False
+            except OSError:
+                # Файловая система без жёстких ссылок.
+                file_move_safe(tmp_path, fname, allow_overwrite=True)
+                return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+
+def single_flight(lock_key, is_ready, compute, lock_timeout,
+                  poll_interval=0.05, cache=None):
+    """Не даёт нескольким процессам одновременно пересчитывать один ключ.
+
+    Если `is_ready()` ложно, значение в кэше отсутствует. Первый запрос
+    берёт блокировку и вызывает `compute()`, который должен положить
+    результат в кэш. Остальные ждут снятия блокировки (не дольше
+    `lock_timeout` секунд) и вызывают `compute()`, который к этому
+    моменту отдаёт готовое значение из кэша.
+    """
+    cache = cache or default_cache
+    if is_ready():
+        return compute()
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            return compute()
+        finally:
+            cache.delete(lock_key)
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline and cache.get(lock_key) is not None:
+        time.sleep(poll_interval)
+    return compute()
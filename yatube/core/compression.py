@@ -0,0 +1,89 @@
+"""Сжатие ответов для core.middleware.CompressionMiddleware.
+
+Поддерживаются brotli (если установлен пакет brotli) и gzip. Кодировка
+выбирается по Accept-Encoding клиента: наибольший q, при равных — порядок
+COMPRESSION_ENCODINGS. Потоковые ответы сжимаются по кускам со сбросом
+буфера после каждого, чтобы клиент получал их сразу, а не в конце.
+"""
+from django.conf import settings
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _brotli_compress(data):
+    return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(
+        quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# Кодировка → (сжать байты, сжать последовательность кусков).
+ENCODERS = {'gzip': (compress_string, compress_sequence)}
+if brotli is not None:
+    ENCODERS['br'] = (_brotli_compress, _brotli_sequence)
+
+
+def available(encodings):
+    """Кодировки из `encodings`, для которых есть реализация."""
+    return [name for name in encodings if name in ENCODERS]
+
+
+def parse_accept_encoding(header):
+    """{кодировка: q} из заголовка Accept-Encoding."""
+    accepted = {}
+    for item in header.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.lower()] = quality
+    return accepted
+
+
+def negotiate(header, encodings):
+    """Лучшая из `encodings` для клиента или None."""
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compressible(response):
+    """Стоит ли сжимать ответ: тип из списка и тело не меньше порога."""
+    if response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').split(';', 1)[0]
+    if content_type.strip().lower() not in settings.COMPRESSION_CONTENT_TYPES:
+        return False
+    if response.streaming:
+        return True
+    return len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+
+def compress(encoding, data):
+    return ENCODERS[encoding][0](data)
+
+
+def compress_stream(encoding, sequence):
+    return ENCODERS[encoding][1](sequence)
@@ -0,0 +1,14 @@
+"""Настройка соединений с базой при их создании."""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: PRAGMA из SQLITE_PRAGMAS.
+
+    Выполняется напрямую в драйвере, мимо обёрток Django: в журнал
+    запросов и счётчики запроса эти команды не попадают.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,124 @@
+"""Отправка почты в фоне.
+
+QueuedEmailBackend (EMAIL_BACKEND) только кладёт письма в очередь
+процесса и сразу возвращает управление: представление, например сброс
+пароля, не ждёт почтовый сервер. Фоновый поток забирает письма пачками
+до EMAIL_BATCH_SIZE и отправляет каждую пачку одним соединением через
+EMAIL_DELIVERY_BACKEND. Не отправленные письма повторяются до
+EMAIL_RETRIES раз с растущей паузой, после чего пишутся в лог
+yatube.mail.
+
+Очередь живёт в памяти процесса: при выходе процесс дожидается её
+(flush), но письма, не отправленные к аварийному завершению, теряются.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+logger = logging.getLogger('yatube.mail')
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_worker = None
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            _queue.put(message)
+        if email_messages:
+            _ensure_worker()
+        return len(email_messages)
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run, name='mail-sender', daemon=True)
+            _worker.start()
+
+
+def _take_batch():
+    batch = [_queue.get()]
+    while len(batch) < settings.EMAIL_BATCH_SIZE:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _send(messages):
+    """Отправляет письма одним соединением, возвращает неотправленные."""
+    try:
+        connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+        connection.open()
+    except Exception:
+        logger.warning('Почтовый сервер недоступен', exc_info=True)
+        return list(messages)
+    failed = []
+    try:
+        for message in messages:
+            try:
+                connection.send_messages([message])
+            except Exception:
+                logger.warning(
+                    'Письмо для %s не отправлено', message.to, exc_info=True)
+                failed.append(message)
+    finally:
+        connection.close()
+    return failed
+
+
+def deliver(messages):
+    """Отправляет письма с повторами; возвращает число отправленных."""
+    pending = list(messages)
+    for attempt in range(settings.EMAIL_RETRIES + 1):
+        if attempt:
+            time.sleep(settings.EMAIL_RETRY_DELAY * 2 ** (attempt - 1))
+        pending = _send(pending)
+        if not pending:
+            break
+    else:
+        logger.error(
+            'Не отправлено писем после %s попыток: %s',
+            settings.EMAIL_RETRIES + 1, len(pending))
+    return len(messages) - len(pending)
+
+
+def _run():
+    while True:
+        batch = _take_batch()
+        try:
+            deliver(batch)
+        except Exception:
+            logger.exception('Ошибка при отправке почты')
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def flush(timeout=None):
+    """Ждёт, пока очередь опустеет; False, если не дождались."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _queue.all_tasks_done:
+        while _queue.unfinished_tasks:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+            _queue.all_tasks_done.wait(remaining)
+    return True
+
+
+atexit.register(lambda: flush(settings.EMAIL_SHUTDOWN_TIMEOUT))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from core import querylog
+
+
+SORT_KEYS = {
+    'total': 'total_ms',
+    'count': 'count',
+    'max': 'max_ms',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает отпечатки SQL-запросов, на которые ушло больше всего '
+        'времени, по статистике всех процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Сколько отпечатков показать.',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=list(SORT_KEYS),
+            default='total',
+            help='По чему сортировать: суммарное время, число, максимум.',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Удалить накопленную статистику после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = querylog.collect()
+        key = SORT_KEYS[options['sort']]
+        top = sorted(
+            stats.items(), key=lambda item: item[1][key], reverse=True
+        )[:options['top']]
+        for sql, entry in top:
+            views = ', '.join(
+                f'{view} ×{count}'
+                for view, count in entry['views'].most_common(3)
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{entry['total_ms']:.1f} мс всего, {entry['count']} раз, "
+                f"среднее {entry['total_ms'] / entry['count']:.2f} мс, "
+                f"максимум {entry['max_ms']:.1f} мс"
+            ))
+            self.stdout.write(f'  {views}')
+            self.stdout.write(f'  {sql}')
+        if options['reset']:
+            querylog.clear_files()
+            self.stdout.write(self.style.SUCCESS('Статистика очищена.'))
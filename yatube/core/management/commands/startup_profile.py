@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет холодный старт воркера в отдельном процессе: импорт '
+        'модулей по пакетам, django.setup, URLconf, движок шаблонов и '
+        'первый запрос, — и показывает самые дорогие шаги и модули.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/',
+            help='Адрес первого запроса.',
+        )
+        parser.add_argument(
+            '--no-request',
+            action='store_true',
+            help='Не делать запросов (и не обращаться к базе).',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Сколько самых долгих модулей показать.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Записать результаты в JSON-файл.',
+        )
+
+    def handle(self, *args, **options):
+        path = None if options['no_request'] else options['path']
+        try:
+            result = startup.profile(path)
+        except RuntimeError as error:
+            raise CommandError(f'Процесс не запустился: {error}')
+        self.stdout.write(self.style.MIGRATE_HEADING('Шаги старта'))
+        self.stdout.write(
+            f"  {'импорт модулей (всего)':<24} "
+            f"{result['import_total_ms']:>9.1f} мс")
+        for name, elapsed in result['phases'].items():
+            self.stdout.write(f'  {name:<24} {elapsed:>9.1f} мс')
+        if result['status'] is not None:
+            self.stdout.write(f"  ответ на {path}: {result['status']}")
+        self.stdout.write(self.style.MIGRATE_HEADING('Импорт по пакетам'))
+        packages = sorted(
+            result['packages'].items(), key=lambda item: -item[1])
+        for package, self_us in packages:
+            self.stdout.write(f'  {package:<24} {self_us / 1000:>9.1f} мс')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Самые долгие модули (собственное время импорта)'))
+        top = sorted(result['modules'], key=lambda item: -item[1])
+        for name, self_us, cumulative_us in top[:options['top']]:
+            self.stdout.write(
+                f'  {name:<48} {self_us / 1000:>7.1f} мс '
+                f'(с вложенными {cumulative_us / 1000:.1f} мс)')
+        for hint in result['hints']:
+            self.stdout.write(self.style.WARNING(hint))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны из каталога templates/: с кэширующим '
+        'загрузчиком прогревает его кэш и в любом случае завершается '
+        'ошибкой, если в каком-то шаблоне есть синтаксическая ошибка.'
+    )
+
+    def handle(self, *args, **options):
+        loaded, elapsed, errors = templates.warm()
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(
+                f'Шаблонов с ошибками: {len(errors)}, '
+                f'разобрано без ошибок: {loaded}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Разобрано шаблонов: {loaded} за {elapsed * 1000:.1f} мс.'))
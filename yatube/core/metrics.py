@@ -0,0 +1,83 @@
+"""Счётчики производительности текущего запроса.
+
+PerformanceMiddleware создаёт RequestMetrics на время запроса, а SQL,
+шаблоны и кэш дописывают в него своё время через contextvar. Вне
+запроса (или в запросе, не попавшем в выборку) текущих метрик нет, и
+все точки записи ничего не делают.
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.template.backends import django as django_backend
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.template_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper()."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def current():
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def record_cache(hits, misses, elapsed):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+        metrics.cache_time += elapsed
+
+
+def instrument_templates():
+    """Засекает время рендера шаблонов верхнего уровня.
+
+    Включения ({% include %}) рендерятся внутри родителя и отдельно не
+    считаются.
+    """
+    render = django_backend.Template.render
+    if getattr(render, 'instrumented', False):
+        return
+
+    @wraps(render)
+    def instrumented_render(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+    instrumented_render.instrumented = True
+    django_backend.Template.render = instrumented_render
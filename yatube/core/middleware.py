@@ -0,0 +1,163 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, metrics, querylog, routers
+
+
+logger = logging.getLogger('yatube.performance')
+
+
+class PerformanceMiddleware:
+    """Время ответа, SQL, шаблоны и кэш для каждого запроса.
+
+    Итог пишется строкой JSON в лог yatube.performance и, если
+    PERFORMANCE_SERVER_TIMING включён, в заголовок Server-Timing (его
+    показывает вкладка Network в браузере). Измеряется доля запросов
+    PERFORMANCE_SAMPLE_RATE, остальные проходят без обёрток.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PERFORMANCE_SAMPLE_RATE
+        self.server_timing = settings.PERFORMANCE_SERVER_TIMING
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        view_token = querylog.set_view(None)
+        try:
+            return self.measure(request)
+        finally:
+            querylog.reset_view(view_token)
+
+    def measure(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(
+                        request_metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+        total = time.perf_counter() - started
+        self.report(request, response, request_metrics, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Имя представления для журнала запросов — для всех запросов,
+        # а не только попавших в выборку.
+        querylog.set_view(request.resolver_match.view_name)
+
+    def report(self, request, response, request_metrics, total):
+        match = request.resolver_match
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={request_metrics.db_time * 1000:.1f};'
+                f'desc="{request_metrics.queries} queries"',
+                f'tpl;dur={request_metrics.template_time * 1000:.1f}',
+                f'cache;dur={request_metrics.cache_time * 1000:.1f};'
+                f'desc="{request_metrics.cache_hits} hit, '
+                f'{request_metrics.cache_misses} miss"',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(json.dumps({
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_queries': request_metrics.queries,
+            'db_ms': round(request_metrics.db_time * 1000, 2),
+            'template_ms': round(request_metrics.template_time * 1000, 2),
+            'cache_hits': request_metrics.cache_hits,
+            'cache_misses': request_metrics.cache_misses,
+            'cache_ms': round(request_metrics.cache_time * 1000, 2),
+        }))
+
+
+class ReplicaRoutingMiddleware:
+    """Решает, может ли запрос читать с реплик (core.routers).
+
+    Если за время запроса что-то записано в базу, ставит cookie,
+    закрепляющую следующие запросы браузера за основной базой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = routers.RoutingState()
+        token = routers.activate(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.deactivate(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.current().use_replica = routers.replica_allowed(request)
+
+
+class CompressionMiddleware:
+    """Сжимает ответы brotli или gzip (core.compression).
+
+    Сжимаются только типы из COMPRESSION_CONTENT_TYPES размером от
+    COMPRESSION_MIN_SIZE байт; потоковые ответы — всегда, по кускам.
+    Стоит выше всех middleware, которые читают или меняют тело ответа, и
+    снаружи кэша страниц: в кэше лежит несжатая версия. ETag становится
+    слабым — тело уже не то, по которому он посчитан; condition()
+    сравнивает If-None-Match слабо, так что 304 продолжают работать.
+    Пустой COMPRESSION_ENCODINGS выключает middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = compression.available(
+            settings.COMPRESSION_ENCODINGS)
+        if not self.encodings:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                encoding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compression.compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,187 @@
+"""Журнал медленных запросов и статистика по «отпечаткам» SQL.
+
+Обёртка выполнения запросов ставится на каждое новое соединение с базой
+(CoreConfig.ready). Запрос сводится к отпечатку — тексту без литералов и
+с одинаковыми списками IN, — и по отпечатку копятся число выполнений,
+суммарное и максимальное время и представления, откуда он пришёл.
+Запросы дольше SLOW_QUERY_THRESHOLD_MS пишутся в лог yatube.slow_queries
+вместе с кодом проекта, который их вызвал.
+
+Статистика процесса раз в QUERY_STATS_FLUSH_INTERVAL секунд (и при
+выходе) сбрасывается в файл в QUERY_STATS_DIR; команда query_stats
+сводит файлы всех процессов и показывает худшие отпечатки. Отпечатков
+в процессе не больше QUERY_STATS_MAX_FINGERPRINTS: новые сверх этого
+числа копятся в общей записи OTHER, чтобы словарь не рос бесконечно.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+
+
+logger = logging.getLogger('yatube.slow_queries')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+OTHER = '(прочие запросы)'
+
+_view = ContextVar('query_view', default=None)
+_lock = threading.Lock()
+_stats = {}
+_last_flush = time.monotonic()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """SQL без литералов: одинаковые по форме запросы дают один отпечаток."""
+    normalized = _STRING_RE.sub('?', sql)
+    normalized = _NUMBER_RE.sub('?', normalized).replace('%s', '?')
+    normalized = _IN_LIST_RE.sub('(...)', normalized)
+    return _SPACE_RE.sub(' ', normalized).strip()
+
+
+def set_view(name):
+    return _view.set(name)
+
+
+def reset_view(token):
+    _view.reset(token)
+
+
+def _project_stack():
+    """Последние кадры стека из кода проекта, без Django и библиотек."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and frame.filename != __file__
+        and 'site-packages' not in frame.filename
+    ]
+    return ''.join(traceback.format_list(frames[-5:]))
+
+
+def record(sql, elapsed_ms):
+    key = fingerprint(sql)
+    view = _view.get() or '-'
+    with _lock:
+        if (key not in _stats
+                and len(_stats) >= settings.QUERY_STATS_MAX_FINGERPRINTS):
+            key = OTHER
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'views': Counter(),
+            }
+        entry['count'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['views'][view] += 1
+    if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            'Медленный запрос %.1f мс в %s: %s\n%s',
+            elapsed_ms, view, sql, _project_stack(),
+        )
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record(sql, (time.perf_counter() - started) * 1000)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: ставит обёртку на соединение."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def snapshot():
+    with _lock:
+        return {
+            key: {**entry, 'views': dict(entry['views'])}
+            for key, entry in _stats.items()
+        }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def _stats_path():
+    return os.path.join(
+        settings.QUERY_STATS_DIR,
+        f'{socket.gethostname()}-{os.getpid()}.json',
+    )
+
+
+def flush():
+    """Записывает накопленную статистику процесса в QUERY_STATS_DIR."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    data = snapshot()
+    if not data:
+        return
+    os.makedirs(settings.QUERY_STATS_DIR, exist_ok=True)
+    path = _stats_path()
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def flush_if_due(**kwargs):
+    """Обработчик request_finished: сброс не чаще раза в интервал."""
+    if time.monotonic() - _last_flush >= settings.QUERY_STATS_FLUSH_INTERVAL:
+        flush()
+
+
+def collect():
+    """Сводная статистика всех процессов, сбросивших её в файлы."""
+    flush()
+    merged = {}
+    directory = settings.QUERY_STATS_DIR
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            data = json.load(f)
+        for key, entry in data.items():
+            total = merged.setdefault(key, {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'views': Counter(),
+            })
+            total['count'] += entry['count']
+            total['total_ms'] += entry['total_ms']
+            total['max_ms'] = max(total['max_ms'], entry['max_ms'])
+            total['views'].update(entry['views'])
+    return merged
+
+
+def clear_files():
+    reset()
+    directory = settings.QUERY_STATS_DIR
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            os.remove(os.path.join(directory, name))
+
+
+atexit.register(lambda: flush() if _stats else None)
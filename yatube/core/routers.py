@@ -0,0 +1,96 @@
+"""Маршрутизация запросов к базе между основной базой и репликами.
+
+С реплик читают только представления из REPLICA_READ_VIEWS, и только в
+GET/HEAD-запросах: решение принимает ReplicaRoutingMiddleware и хранит
+его в contextvar на время запроса. Всё остальное — формы, лайки,
+подписки, команды, фоновые потоки — читает и пишет в default.
+
+После записи запрос до конца читает из default. Если записаны данные
+приложения (а не служебные таблицы из UNTRACKED_WRITES), браузер получает
+cookie REPLICA_STICKY_COOKIE: следующие REPLICA_STICKY_SECONDS секунд его
+запросы тоже идут в default, и пользователь видит свои изменения, даже
+если реплика отстаёт.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+_state = ContextVar('db_routing', default=None)
+
+# Сессии всегда читаются из default: если отстающая реплика не знает
+# сессию, пользователь выглядит разлогиненным, и Django удаляет его cookie.
+PRIMARY_APPS = {'sessions'}
+
+# Служебные записи, которые случаются и в GET: сессия, метаданные миниатюр
+# sorl, пересчёт счётчиков профиля. Пользователь их не «видит», поэтому
+# они не закрепляют браузер за default.
+UNTRACKED_WRITES = PRIMARY_APPS | {'thumbnail', 'posts.userstats'}
+
+
+def _tracked(model):
+    meta = model._meta
+    return not ({meta.app_label, meta.label_lower} & UNTRACKED_WRITES)
+
+
+class RoutingState:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def current():
+    return _state.get()
+
+
+def activate(state):
+    return _state.set(state)
+
+
+def deactivate(token):
+    _state.reset(token)
+
+
+def replica_allowed(request):
+    """Можно ли запросу `request` читать с реплики."""
+    match = request.resolver_match
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and request.method in ('GET', 'HEAD')
+        and match is not None
+        and match.view_name in settings.REPLICA_READ_VIEWS
+        and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+    )
+
+
+class ReplicaRouter:
+    """Чтение — с реплик из DATABASE_REPLICAS, если запрос это разрешил.
+
+    Объекты, уже загруженные из какой-то базы, дочитывают связанные
+    данные оттуда же.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if model._meta.app_label in PRIMARY_APPS:
+            return None
+        state = _state.get()
+        if state is not None and state.use_replica:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = state.wrote or _tracked(model)
+            state.use_replica = False
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,121 @@
+"""Профиль холодного старта процесса.
+
+Замер идёт в отдельном процессе Python с -X importtime: в текущем все
+модули уже импортированы. Дочерний процесс по шагам повторяет старт
+воркера — настройки и приложения (django.setup), URLconf, движок
+шаблонов, первый запрос — и печатает время шагов в JSON, а время импорта
+каждого модуля Python пишет в stderr.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+
+# Пакеты, время импорта которых показывается отдельной строкой.
+PACKAGES = ('posts', 'users', 'core', 'about', 'sorl', 'PIL', 'django')
+
+# Известные дорогие импорты, на которые можно повлиять, и что с ними делать.
+HINTS = {
+    'pkg_resources': (
+        'distutils для django.utils.version подменён shim-ом setuptools, '
+        'который тянет pkg_resources; SETUPTOOLS_USE_DISTUTILS=stdlib в '
+        'окружении воркера возвращает стандартный distutils.'
+    ),
+    'sorl.thumbnail.base': (
+        'sorl импортирован при старте: модули проекта должны обращаться к '
+        'нему только внутри функций (см. posts.thumbnails).'
+    ),
+    'PIL.Image': (
+        'Pillow импортирован при старте, хотя нужен только при обработке '
+        'картинок.'
+    ),
+}
+
+_IMPORT_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+SCRIPT = '''
+import json, sys, time
+
+path = sys.argv[1]
+phases = {}
+
+def step(name, func):
+    started = time.perf_counter()
+    result = func()
+    phases[name] = (time.perf_counter() - started) * 1000
+    return result
+
+import django
+step('django.setup', django.setup)
+
+from django.urls import get_resolver, resolve
+step('urlconf', lambda: (get_resolver().url_patterns, resolve(path or '/')))
+
+from django.template import engines
+step('templates', lambda: [
+    engine.get_template('base.html') for engine in engines.all()])
+
+status = None
+if path:
+    from django.test import Client
+    client = Client()
+    status = step('first_request', lambda: client.get(path)).status_code
+    step('second_request', lambda: client.get(path))
+
+print(json.dumps({'phases': phases, 'status': status}))
+'''
+
+
+def parse_importtime(lines):
+    """[(модуль, собственное время, с вложенными импортами)] в мкс."""
+    modules = []
+    for line in lines:
+        match = _IMPORT_RE.match(line.rstrip())
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def package_totals(modules, packages=PACKAGES):
+    """{пакет: суммарное собственное время импорта его модулей, мкс}."""
+    totals = dict.fromkeys(packages, 0)
+    for name, self_us, _ in modules:
+        package = name.split('.', 1)[0]
+        if package in totals:
+            totals[package] += self_us
+    return totals
+
+
+def profile(path='/'):
+    """Запускает холодный старт и возвращает шаги и импорты.
+
+    Пустой `path` — без запросов (и без обращений к базе).
+    """
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, path or ''],
+        cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=False,
+    )
+    if process.returncode:
+        errors = [
+            line for line in process.stderr.splitlines()
+            if not _IMPORT_RE.match(line)
+        ]
+        raise RuntimeError(errors[-1] if errors else process.returncode)
+    modules = parse_importtime(process.stderr.splitlines())
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['modules'] = modules
+    result['packages'] = package_totals(modules)
+    result['import_total_ms'] = sum(item[1] for item in modules) / 1000
+    imported = {item[0] for item in modules}
+    result['hints'] = [
+        hint for module, hint in HINTS.items() if module in imported]
+    return result
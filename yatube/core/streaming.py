@@ -0,0 +1,94 @@
+"""Потоковый рендер страниц.
+
+render() собирает страницу целиком и только потом отдаёт её клиенту,
+так что браузер ждёт, пока не отрендерится последняя карточка. В
+потоковом режиме шаблон рендерится так же, один раз, но блоки
+{% streamed %} (карточка поста, комментарий) вместо HTML вставляют в
+страницу метку и откладывают свой рендер (Stream.defer). Ответ —
+StreamingHttpResponse: сначала всё до первой метки (head со стилями,
+шапка, пагинатор), затем блоки по одному по мере рендера, между ними —
+разметка страницы.
+
+Режим включается настройкой STREAMING_RENDER или параметром ?stream=1
+(?stream=0 выключает). Потоковый ответ не кэшируется cache_page и не
+имеет response.content, поэтому по умолчанию выключен.
+"""
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template import Context
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+PARAM = 'stream'
+
+_stream = ContextVar('stream', default=None)
+
+
+class Stream:
+    """Отложенные блоки страницы и метка, на место которой они встанут."""
+
+    def __init__(self):
+        self.marker = f'<!--stream:{uuid.uuid4().hex}-->'
+        self.deferred = []
+
+    def defer(self, render_block):
+        self.deferred.append(render_block)
+        return mark_safe(self.marker)
+
+    def iterate(self, html):
+        head, *tails = html.split(self.marker)
+        yield head
+        for render_block, tail in zip(self.deferred, tails):
+            yield render_block() + tail
+
+
+def current():
+    """Поток рендерящейся сейчас страницы или None."""
+    return _stream.get()
+
+
+def requested(request):
+    value = request.GET.get(PARAM)
+    if value in ('0', '1'):
+        return value == '1'
+    return settings.STREAMING_RENDER
+
+
+def render_page(request, template_name, context, status=None):
+    """Как render(), но в потоковом режиме отдаёт StreamingHttpResponse."""
+    if not requested(request):
+        return render(request, template_name, context, status=status)
+    stream = Stream()
+    token = _stream.set(stream)
+    try:
+        html = render_to_string(template_name, context, request)
+    finally:
+        _stream.reset(token)
+    return StreamingHttpResponse(stream.iterate(html), status=status)
+
+
+def snapshot(context):
+    """Копия контекста шаблона для рендера после основного.
+
+    forloop цикл меняет на месте, поэтому копируется отдельно. csrf-токен
+    вычисляется сразу: cookie с ним ставит CsrfViewMiddleware, а она
+    отрабатывает до начала потока.
+    """
+    flat = context.flatten()
+    if 'forloop' in flat:
+        flat['forloop'] = dict(flat['forloop'])
+    if 'csrf_token' in flat:
+        flat['csrf_token'] = str(flat['csrf_token'])
+    copy = Context(
+        flat,
+        autoescape=context.autoescape,
+        use_l10n=context.use_l10n,
+        use_tz=context.use_tz,
+    )
+    copy.template = context.template
+    return copy
@@ -0,0 +1,74 @@
+"""Загрузка шаблонов: кэширующий загрузчик и прогрев при старте.
+
+Без кэширующего загрузчика Django читает и разбирает файл шаблона при
+каждом рендере. С ним (CACHED_TEMPLATES) шаблон разбирается один раз на
+процесс, а warm() делает это сразу при старте для всех файлов из
+каталогов DIRS: первый запрос не платит за разбор, а синтаксическая
+ошибка в любом шаблоне видна до того, как процесс начнёт принимать
+запросы.
+"""
+import copy
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+
+BACKEND = 'django.template.backends.django.DjangoTemplates'
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+def loaders(cached):
+    """Значение OPTIONS['loaders'] для TEMPLATES."""
+    if cached:
+        return [(CACHED_LOADER, list(settings.TEMPLATE_LOADERS))]
+    return list(settings.TEMPLATE_LOADERS)
+
+
+def with_loaders(templates, cached):
+    """Копия настройки TEMPLATES с заданным режимом загрузчиков."""
+    templates = copy.deepcopy(templates)
+    for config in templates:
+        if config['BACKEND'] != BACKEND:
+            continue
+        config['APP_DIRS'] = False
+        config.setdefault('OPTIONS', {})['loaders'] = loaders(cached)
+    return templates
+
+
+def template_names(engine):
+    """Имена всех шаблонов в каталогах DIRS движка."""
+    names = []
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(root, filename)
+                names.append(os.path.relpath(path, directory))
+    return sorted(names)
+
+
+def warm():
+    """Разбирает все шаблоны проекта.
+
+    Возвращает (число шаблонов, секунды, {имя: ошибка}). С кэширующим
+    загрузчиком разобранные шаблоны остаются в его кэше.
+    """
+    loaded = 0
+    errors = {}
+    started = time.perf_counter()
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                errors[name] = error
+            else:
+                loaded += 1
+    return loaded, time.perf_counter() - started, errors
@@ -0,0 +1,31 @@
+from django import template
+
+from core import streaming
+
+
+register = template.Library()
+
+
+class StreamedNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        stream = streaming.current()
+        if stream is None:
+            return self.nodelist.render(context)
+        copy = streaming.snapshot(context)
+        return stream.defer(lambda: self.nodelist.render(copy))
+
+
+@register.tag
+def streamed(parser, token):
+    """Блок, который в потоковом режиме уходит клиенту отдельным куском.
+
+    {% streamed %}...{% endstreamed %} — обычно тело элемента списка:
+    карточка поста, комментарий. Без потокового режима просто рендерит
+    содержимое.
+    """
+    nodelist = parser.parse(('endstreamed',))
+    parser.delete_first_token()
+    return StreamedNode(nodelist)
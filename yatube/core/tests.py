@@ -1,6 +1,42 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
 from http import HTTPStatus
 
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db.utils import ConnectionHandler
+from django.template import engines
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import resolve, reverse
+from sorl.thumbnail.models import KVStore
+
+from core import mail as mail_queue
+from core import (
+    compression, metrics, querylog, routers, startup, templates
+)
+from core.cache import (
+    CompressedLocMemCache, CompressedValue, FileBasedCache, single_flight
+)
+from core.middleware import CompressionMiddleware, ReplicaRoutingMiddleware
+from core.routers import ReplicaRouter
+from posts.models import Post, UserStats
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +44,391 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class CacheBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = CompressedLocMemCache(
+            'core-tests', {'OPTIONS': {'COMPRESS_MIN_LENGTH': 100}})
+        self.cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.file_cache = FileBasedCache(self.directory, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_large_values_are_compressed(self):
+        page = 'post card ' * 1000
+        self.cache.set('page', page)
+        self.cache.set('small', 'tiny')
+        self.assertIsInstance(
+            LocMemCache.get(self.cache, 'page'), CompressedValue)
+        self.assertEqual(LocMemCache.get(self.cache, 'small'), 'tiny')
+        self.assertEqual(self.cache.get('page'), page)
+        self.assertEqual(
+            self.cache.get_many(['page', 'small']),
+            {'page': page, 'small': 'tiny'})
+
+    def test_tests_use_own_cache(self):
+        '''Тесты не делят кэш с сервером: cache.clear() его не сотрёт.'''
+        default = settings.CACHES['default']
+        self.assertEqual(default['KEY_PREFIX'], 'yatube_test')
+        self.assertTrue(os.path.basename(default['LOCATION']).startswith(
+            'yatube_test_cache_'))
+
+    def test_file_cache_add_is_exclusive(self):
+        self.assertTrue(self.file_cache.add('lock', 1))
+        self.assertFalse(self.file_cache.add('lock', 2))
+        self.assertEqual(self.file_cache.get('lock'), 1)
+
+    def test_single_flight_computes_once(self):
+        '''Одновременные промахи по одному ключу считаются один раз.'''
+        computed = []
+
+        def compute():
+            value = self.cache.get('value')
+            if value is None:
+                computed.append(1)
+                time.sleep(0.1)
+                value = 'rendered'
+                self.cache.set('value', value)
+            return value
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight(
+                'lock:value',
+                lambda: self.cache.has_key('value'),
+                compute,
+                lock_timeout=2,
+                poll_interval=0.01,
+                cache=self.cache,
+            )))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(results, ['rendered'] * 5)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def test_server_timing_header(self):
+        '''Ответ содержит замеры SQL, шаблонов и кэша.'''
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            response = self.client.get('/nonexist-page/')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertIn('"status": 404', logs.output[0])
+
+    def test_report_is_not_serialized_when_log_is_off(self):
+        '''Без INFO в логе строка JSON с замерами не собирается.'''
+        with mock.patch('core.middleware.json.dumps') as dumps:
+            self.client.get('/nonexist-page/')
+        dumps.assert_not_called()
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        '''Запросы вне выборки проходят без замеров.'''
+        response = self.client.get('/nonexist-page/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_cache_hits_and_misses_are_recorded(self):
+        '''Кэш сообщает о попаданиях и промахах в метрики запроса.'''
+        cache = CompressedLocMemCache('metrics-tests', {})
+        cache.set('present', 1)
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        try:
+            cache.get('present')
+            cache.get('absent')
+            cache.get_many(['present', 'absent'])
+        finally:
+            metrics.deactivate(token)
+        self.assertEqual(request_metrics.cache_hits, 2)
+        self.assertEqual(request_metrics.cache_misses, 2)
+
+
+class QueryLogTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        override = override_settings(QUERY_STATS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        querylog.reset()
+
+    def test_fingerprint_strips_literals(self):
+        '''Запросы, отличающиеся только значениями, дают один отпечаток.'''
+        self.assertEqual(
+            querylog.fingerprint(
+                "SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s) LIMIT 10"),
+            querylog.fingerprint(
+                "SELECT  * FROM t WHERE a = 'yy' AND b IN (%s) LIMIT 20"),
+        )
+
+    def test_queries_are_aggregated_by_view(self):
+        '''Статистика знает, из какого представления пришёл запрос.'''
+        self.client.get('/search/', {'q': 'текст'})
+        self.client.get('/search/', {'q': 'текст'})
+        views = Counter()
+        for entry in querylog.snapshot().values():
+            views.update(entry['views'])
+        self.assertIn('posts:search', views)
+
+    @override_settings(QUERY_STATS_MAX_FINGERPRINTS=2)
+    def test_fingerprints_are_capped(self):
+        '''Сверх лимита новые отпечатки копятся в одной общей записи.'''
+        for table in ('a', 'b', 'c', 'd'):
+            querylog.record(f'SELECT * FROM {table}', 1.0)
+        stats = querylog.snapshot()
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(stats[querylog.OTHER]['count'], 2)
+        querylog.record('SELECT * FROM a', 1.0)
+        self.assertEqual(querylog.snapshot()['SELECT * FROM a']['count'], 2)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_logged(self):
+        '''Запрос дольше порога попадает в лог со стеком вызова.'''
+        with self.assertLogs('yatube.slow_queries', 'WARNING') as logs:
+            self.client.get('/search/', {'q': 'текст'})
+        self.assertIn('posts:search', logs.output[0])
+
+    def test_query_stats_command(self):
+        '''query_stats сводит статистику из файлов и очищает её.'''
+        self.client.get('/search/', {'q': 'текст'})
+        out = StringIO()
+        call_command('query_stats', '--top', '3', '--reset', stdout=out)
+        self.assertIn('SELECT', out.getvalue())
+        self.assertEqual(querylog.collect(), {})
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        with open(os.path.join(self.directory, name), 'w') as f:
+            f.write(content)
+
+    def template_settings(self):
+        config = templates.with_loaders(settings.TEMPLATES, cached=True)
+        config[0]['DIRS'] = [self.directory]
+        return config
+
+    def test_templates_are_parsed_into_cache(self):
+        self.write('page.html', '{% if ok %}ok{% endif %}')
+        with override_settings(TEMPLATES=self.template_settings()):
+            loaded, _, errors = templates.warm()
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertEqual((loaded, errors), (1, {}))
+            self.assertEqual(len(loader.get_template_cache), 1)
+
+    def test_syntax_errors_fail_the_command(self):
+        self.write('page.html', 'ok')
+        self.write('broken.html', '{% if ok %}')
+        with override_settings(TEMPLATES=self.template_settings()):
+            with self.assertRaises(CommandError):
+                call_command('warm_templates', stdout=StringIO(),
+                             stderr=StringIO())
+
+
+class DatabaseSetupTests(SimpleTestCase):
+    def test_sqlite_pragmas_applied_to_new_connections(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connection = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+        }})['default']
+        self.addCleanup(connection.close)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, path, method='get', write=None, cookies=None):
+        """База для чтения внутри представления и cookie ответа.
+
+        `write` — модель, в которую представление пишет.
+        """
+        router = ReplicaRouter()
+        seen = {}
+
+        def view(request):
+            if write is not None:
+                router.db_for_write(write)
+            seen['read'] = router.db_for_read(Post) or 'default'
+            return HttpResponse()
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        response = middleware(request)
+        return seen['read'], response.cookies
+
+    def test_feeds_read_from_replicas(self):
+        for path in ('/', '/group/slug/', '/profile/name/', '/posts/1/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.route(path)[0], 'replica_1')
+
+    def test_other_views_use_primary(self):
+        self.assertEqual(self.route('/create/')[0], 'default')
+        self.assertEqual(self.route('/', method='post')[0], 'default')
+        self.assertIsNone(ReplicaRouter().db_for_read(Post))
+
+    def test_sessions_always_read_from_primary(self):
+        state = routers.RoutingState()
+        state.use_replica = True
+        token = routers.activate(state)
+        try:
+            self.assertIsNone(ReplicaRouter().db_for_read(Session))
+        finally:
+            routers.deactivate(token)
+
+    def test_primary_is_sticky_after_write(self):
+        read, cookies = self.route('/posts/1/comment/', 'post', write=Post)
+        self.assertEqual(read, 'default')
+        cookie = cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        read, _ = self.route(
+            '/', cookies={settings.REPLICA_STICKY_COOKIE: '1'})
+        self.assertEqual(read, 'default')
+        self.assertEqual(self.route('/', write=Post)[0], 'default')
+        self.assertIsNone(routers.current())
+
+    def test_bookkeeping_writes_are_not_sticky(self):
+        '''Сессия, миниатюры и счётчики в GET не закрепляют за default.'''
+        for model in (Session, KVStore, UserStats):
+            with self.subTest(model=model.__name__):
+                read, cookies = self.route('/', write=model)
+                self.assertEqual(read, 'default')
+                self.assertNotIn(settings.REPLICA_STICKY_COOKIE, cookies)
+
+
+class FlakyEmailBackend(EmailBackend):
+    """Первая отправка каждого письма падает."""
+    attempts = Counter()
+
+    def send_messages(self, messages):
+        for message in messages:
+            self.attempts[message.subject] += 1
+            if self.attempts[message.subject] == 1:
+                raise ConnectionError('SMTP недоступен')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_RETRY_DELAY=0,
+)
+class MailQueueTests(TestCase):
+    def test_password_reset_mail_sent_in_background(self):
+        get_user_model().objects.create_user(
+            username='reader', email='reader@example.com', password='pw')
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'reader@example.com'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertTrue(mail_queue.flush(timeout=5))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='core.tests.FlakyEmailBackend')
+    def test_failed_messages_are_retried(self):
+        FlakyEmailBackend.attempts.clear()
+        with self.assertLogs('yatube.mail', 'WARNING') as logs:
+            for subject in ('first', 'second'):
+                mail.send_mail(subject, 'text', None, ['to@example.com'])
+            self.assertTrue(mail_queue.flush(timeout=5))
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            ['first', 'second'])
+        self.assertEqual(FlakyEmailBackend.attempts['first'], 2)
+
+
+class StartupProfileTests(SimpleTestCase):
+    def test_importtime_output_is_grouped_by_package(self):
+        modules = startup.parse_importtime([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |     posts.models',
+            'import time:       300 |        420 | posts',
+            'import time:        50 |         50 | sorl.thumbnail',
+            'Traceback (most recent call last):',
+        ])
+        self.assertEqual(modules, [
+            ('posts.models', 120, 120),
+            ('posts', 300, 420),
+            ('sorl.thumbnail', 50, 50),
+        ])
+        totals = startup.package_totals(modules)
+        self.assertEqual(totals['posts'], 420)
+        self.assertEqual(totals['sorl'], 50)
+        self.assertEqual(totals['PIL'], 0)
+
+
+@override_settings(COMPRESSION_ENCODINGS=['gzip'])
+class CompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, response, accept='gzip, deflate'):
+        middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return middleware(request)
+
+    def test_encoding_negotiation(self):
+        self.assertEqual(
+            compression.negotiate('gzip;q=0.5, br', ['br', 'gzip']), 'br')
+        self.assertEqual(
+            compression.negotiate('br;q=0.2, gzip', ['br', 'gzip']), 'gzip')
+        self.assertEqual(compression.negotiate('*', ['gzip']), 'gzip')
+        self.assertIsNone(compression.negotiate('gzip;q=0', ['gzip']))
+        self.assertIsNone(compression.negotiate('', ['gzip']))
+
+    def test_large_html_is_compressed(self):
+        body = 'пост ' * 500
+        response = HttpResponse(body)
+        response['ETag'] = '"abc"'
+        response = self.respond(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content).decode(), body)
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content))
+
+    def test_small_and_unlisted_responses_are_left_alone(self):
+        for response in (
+            HttpResponse('коротко'),
+            HttpResponse(b'x' * 5000, content_type='image/png'),
+        ):
+            with self.subTest(content_type=response['Content-Type']):
+                self.assertFalse(
+                    self.respond(response).has_header('Content-Encoding'))
+        response = self.respond(HttpResponse('x' * 5000), accept='')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed_by_chunks(self):
+        chunks = ['<html>', 'карточка ' * 100, '</html>']
+        response = self.respond(StreamingHttpResponse(iter(chunks)))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(data).decode(), ''.join(chunks))
+
+    @override_settings(COMPRESSION_ENCODINGS=['zstd'])
+    def test_unavailable_encodings_disable_middleware(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            CompressionMiddleware(lambda request: HttpResponse())
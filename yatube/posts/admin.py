@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from . import search
+from .models import Post, Group, Comment, Follow, UserStats
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,8 +17,19 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        '''Ищет по полнотекстовому индексу вместо LIKE '%...%'.'''
+        if not search_term or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        ids = search.matching_ids(search_term)
+        if ids is None:
+            return queryset, False
+        return queryset.filter(pk__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.register(UserStats)
@@ -0,0 +1,149 @@
+"""JSON API лент только для чтения.
+
+Посты выбираются теми же запросами, что и в HTML-лентах, но через
+.values(): вместо моделей — словари с нужными колонками, а сериализатор
+просто переименовывает ключи и переводит даты и картинки в строки.
+Параметр ?fields=id,text,author оставляет в ответе (и в SELECT) только
+перечисленные поля. Страницы — те же курсоры, что в HTML
+(yatube.utils.CursorPaginator).
+"""
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from yatube.utils import CursorPaginator
+
+
+# Поле ответа → путь в .values() от модели Post.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'likes': 'likes_count',
+    'comments': 'comments_count',
+}
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _media_url(value):
+    return settings.MEDIA_URL + value
+
+
+CONVERTERS = {
+    'pub_date': _isoformat,
+    'created': _isoformat,
+    'image': _media_url,
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(request, available=POST_FIELDS):
+    """Поля из ?fields= в порядке запроса; без параметра — все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise FieldsError(
+            f"Неизвестные поля: {', '.join(unknown)}. "
+            f"Доступны: {', '.join(available)}.")
+    return list(dict.fromkeys(fields))
+
+
+def serialize(rows, fields, paths, prefix=''):
+    """Список словарей ответа из строк .values()."""
+    columns = [
+        (name, prefix + paths[name], CONVERTERS.get(name))
+        for name in fields
+    ]
+    items = []
+    for row in rows:
+        item = {}
+        for name, path, convert in columns:
+            value = row[path]
+            if convert is not None and value:
+                value = convert(value)
+            item[name] = value
+        items.append(item)
+    return items
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+        content_type='application/json; charset=utf-8',
+        status=status,
+    )
+
+
+def error(message, status):
+    return json_response({'error': message}, status=status)
+
+
+def paginate(queryset, fields, paths, cursor, per_page, ordering,
+             prefix=''):
+    """Страница строк .values() и курсоры соседних страниц.
+
+    Поля ключа сортировки выбираются всегда: по ним строятся курсоры.
+    """
+    paginator = CursorPaginator(queryset, per_page, ordering=ordering)
+    selected = [prefix + paths[name] for name in fields]
+    selected += [
+        name for name in paginator.field_names if name not in selected]
+    paginator.object_list = paginator.object_list.values(*selected)
+    page = paginator.get_cursor_page(cursor)
+    return {
+        'results': serialize(page.object_list, fields, paths, prefix),
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+def feed_response(request, queryset, ordering=('-pub_date', '-id'),
+                  prefix=''):
+    """Ответ ленты постов с ?fields= и ?cursor=."""
+    try:
+        fields = parse_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    return json_response(paginate(
+        queryset, fields, POST_FIELDS, request.GET.get('cursor'),
+        settings.POSTS_QUANTITY, ordering, prefix,
+    ))
+
+
+def post_response(request, post_queryset, comments_queryset):
+    """Пост с первой (или ?comments_cursor=) страницей комментариев."""
+    try:
+        fields = parse_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    rows = list(post_queryset.values(
+        *[POST_FIELDS[name] for name in fields]))
+    if not rows:
+        return error('Пост не найден.', 404)
+    data = serialize(rows, fields, POST_FIELDS)[0]
+    data['comment_list'] = paginate(
+        comments_queryset, list(COMMENT_FIELDS), COMMENT_FIELDS,
+        request.GET.get('comments_cursor'), settings.COMMENTS_QUANTITY,
+        ('created', 'id'),
+    )
+    return json_response(data)
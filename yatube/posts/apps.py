@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.core.signals import request_finished
+
+        from . import signals  # noqa: F401
+        from . import thumbnails
+
+        request_finished.connect(
+            thumbnails.flush_stats_if_due,
+            dispatch_uid='posts.thumbnails.flush_stats_if_due')
@@ -0,0 +1,234 @@
+"""Нагрузочные замеры представлений posts на синтетических данных.
+
+generate_dataset заполняет базу: пользователи и группы через mixer,
+тексты через Faker, посты, комментарии и подписки — bulk_create, после
+чего пересчитываются счётчики и ленты. run_benchmarks прогоняет сценарии
+через тестовый клиент Django и для каждого собирает p50/p95 времени
+ответа (потоковые ответы дочитываются до конца) и до первого куска
+тела, число SQL-запросов, размер ответа в байтах и время рендера
+шаблонов (из заголовка Server-Timing, если он включён).
+
+Запуск — команда benchmark_views, она работает на отдельной тестовой
+базе и не трогает рабочую.
+"""
+import datetime as dt
+import math
+import random
+import re
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from . import counters, search, timeline
+from .transfer import preserve_dates
+from .models import Comment, Follow, Group, Post, User
+
+
+DATASETS = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+BENCH_USERNAME = 'benchmark_reader'
+
+GENERATE_BATCH_SIZE = 5000
+
+_TEMPLATE_TIMING_RE = re.compile(r'\btpl;dur=([\d.]+)')
+
+
+def dataset_shape(posts):
+    """Сколько пользователей, групп, подписок и комментариев на `posts`."""
+    return {
+        'posts': posts,
+        'users': max(10, min(posts // 100, 5000)),
+        'groups': max(3, min(posts // 1000, 200)),
+        'follows': 50,
+        'comments': max(50, min(posts // 10, 100_000)),
+    }
+
+
+def _fake_posts(fake, count, author_ids, group_ids, started):
+    for i in range(count):
+        pub_date = started - dt.timedelta(minutes=count - i)
+        yield Post(
+            text=fake.text(max_nb_chars=300),
+            author_id=random.choice(author_ids),
+            group_id=random.choice(group_ids) if i % 3 else None,
+            pub_date=pub_date,
+            created=pub_date,
+            updated=pub_date,
+        )
+
+
+def _bulk_create(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == GENERATE_BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def generate_dataset(posts, seed=0):
+    """Заполняет базу синтетическими данными, возвращает их размеры."""
+    shape = dataset_shape(posts)
+    random.seed(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    reader = User.objects.create_user(username=BENCH_USERNAME)
+    authors = mixer.cycle(shape['users']).blend(
+        User, username=mixer.sequence('bench_author_{0}'))
+    groups = mixer.cycle(shape['groups']).blend(
+        Group, slug=mixer.sequence('bench-group-{0}'))
+    author_ids = [author.pk for author in authors]
+    group_ids = [group.pk for group in groups]
+    with preserve_dates(Post):
+        _bulk_create(Post, _fake_posts(
+            fake, posts, author_ids, group_ids, timezone.now()))
+    hot_post = Post.objects.order_by('-pub_date', '-id').first()
+    Comment.objects.bulk_create(
+        Comment(post=hot_post, author_id=random.choice(author_ids),
+                text=fake.sentence())
+        for _ in range(shape['comments'])
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author_id=author_id)
+        for author_id in author_ids[:shape['follows']]
+    )
+    counters.recount_posts()
+    counters.recount_user_stats()
+    timeline.rebuild()
+    search.reindex(GENERATE_BATCH_SIZE)
+    return shape
+
+
+def percentile(values, share):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(share * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def template_time(response):
+    """Время рендера шаблонов по Server-Timing в мс или None."""
+    match = _TEMPLATE_TIMING_RE.search(response.get('Server-Timing', ''))
+    return float(match.group(1)) if match else None
+
+
+def response_body(response):
+    """Тело ответа; потоковый ответ дочитывается до конца."""
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def measure(request, repeat, cold=False):
+    """Выполняет `request()` `repeat` раз и собирает статистику."""
+    request()
+    timings, queries, sizes, statuses = [], [], [], set()
+    templates, first_bytes = [], []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = request()
+            first_bytes.append((time.perf_counter() - started) * 1000)
+            body = response_body(response)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context))
+        sizes.append(len(body))
+        statuses.add(response.status_code)
+        templates.append(template_time(response))
+    result = {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'first_byte_p50_ms': round(percentile(first_bytes, 0.5), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': round(statistics.mean(queries), 2),
+        'bytes': round(statistics.mean(sizes)),
+        'status': sorted(statuses),
+    }
+    if None not in templates:
+        result['template_p50_ms'] = round(percentile(templates, 0.5), 3)
+    return result
+
+
+def scenarios(client):
+    """{название: функция, выполняющая запрос}."""
+    post = Post.objects.order_by('-pub_date', '-id').first()
+    group = Group.objects.order_by('pk').first()
+    detail_url = reverse('posts:post_detail', args=[post.pk])
+    return {
+        'index': lambda: client.get(reverse('posts:index')),
+        'group_posts': lambda: client.get(
+            reverse('posts:group_list', args=[group.slug])),
+        'profile': lambda: client.get(
+            reverse('posts:profile', args=[post.author.username])),
+        'post_detail': lambda: client.get(detail_url),
+        'follow_index': lambda: client.get(reverse('posts:follow_index')),
+        'api_index': lambda: client.get(reverse('posts:api_index')),
+        'api_group_posts': lambda: client.get(
+            reverse('posts:api_group_list', args=[group.slug])),
+        'api_profile': lambda: client.get(
+            reverse('posts:api_profile', args=[post.author.username])),
+        'api_post_detail': lambda: client.get(
+            reverse('posts:api_post_detail', args=[post.pk])),
+        'api_follow_index': lambda: client.get(
+            reverse('posts:api_follow_index')),
+        'like_post': lambda: client.post(
+            reverse('posts:like_post', args=[post.pk]),
+            HTTP_ACCEPT='application/json'),
+        'add_comment': lambda: client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'benchmark comment'}),
+    }
+
+
+def run_benchmarks(repeat=50, cold=False, only=None, accept_encoding=None):
+    """Прогоняет сценарии от имени пользователя BENCH_USERNAME.
+
+    С `accept_encoding` клиент просит сжатые ответы, и в отчёт попадает
+    размер сжатого тела.
+    """
+    headers = {}
+    if accept_encoding:
+        headers['HTTP_ACCEPT_ENCODING'] = accept_encoding
+    client = Client(**headers)
+    client.force_login(User.objects.get(username=BENCH_USERNAME))
+    results = {}
+    for name, request in scenarios(client).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(request, repeat, cold)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Строки отчёта о регрессиях относительно `baseline`.
+
+    Регрессия — больше SQL-запросов или p50 (ответа либо рендера
+    шаблонов) хуже на `tolerance` долей.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f"{name}: запросов {previous['queries']} → "
+                f"{current['queries']}")
+        for key, label in (('p50_ms', 'p50'), ('template_p50_ms', 'шаблоны')):
+            if key not in current or key not in previous:
+                continue
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {label} {previous[key]} → {current[key]} мс')
+    return regressions
@@ -0,0 +1,83 @@
+"""Кэш страниц с инвалидацией по событиям.
+
+Вместо короткого TTL у каждой группы данных есть номер поколения
+(generation). Сигналы сдвигают его при изменении постов, лайков или
+групп, а номер входит в ключ закэшированной страницы: после изменения
+страница просто ищется по новому ключу, старые записи доживают свой TTL
+и вытесняются. Поэтому сам TTL может быть длинным.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_cache_key
+from django.views.decorators.cache import cache_page
+
+from core.cache import single_flight
+
+
+POSTS = 'posts'
+GROUPS = 'groups'
+# Готовность миниатюр: сдвигается, когда пул дорезал картинку поста.
+THUMBNAILS = 'thumbnails'
+# Комментарии: любое добавление, правка или удаление.
+COMMENTS = 'comments'
+
+
+def _generation_key(name):
+    return f'generation:{name}'
+
+
+def _seed():
+    # Начинаем не с 1, а с текущего времени: если ключ поколения будет
+    # вытеснен, новое значение не совпадёт ни с одним из старых.
+    return int(time.time() * 1000)
+
+
+def get_generations(*names):
+    keys = [_generation_key(name) for name in names]
+    found = cache.get_many(keys)
+    missing = {key: _seed() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*names):
+    for name in names:
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _seed(), None)
+
+
+def cache_page_versioned(timeout, key_prefix, generations):
+    """Как cache_page, но ключ зависит от поколений `generations`.
+
+    Учёт заголовков Vary (сессия, язык) остаётся за Django. Если страницы
+    нет в кэше, её рендерит только один из одновременных запросов.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            versions = '.'.join(map(str, get_generations(*generations)))
+            prefix = f'{key_prefix}:{versions}'
+            cached_view = cache_page(timeout, key_prefix=prefix)(view_func)
+            if request.method not in ('GET', 'HEAD'):
+                return cached_view(request, *args, **kwargs)
+            cache_key = get_cache_key(request, prefix, 'GET', cache=cache)
+            lock_key = cache_key or hashlib.md5(
+                f'{prefix}:{request.build_absolute_uri()}'.encode()
+            ).hexdigest()
+            return single_flight(
+                f'lock:{lock_key}',
+                lambda: cache_key is not None and cache.has_key(cache_key),
+                lambda: cached_view(request, *args, **kwargs),
+                settings.CACHE_STAMPEDE_LOCK_TIMEOUT,
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,92 @@
+"""Пересчёт денормализованных счётчиков.
+
+В обычной работе счётчики сдвигаются на ±1 сигналами из posts.signals,
+а здесь — полный пересчёт из исходных таблиц для починки расхождений.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+RECOUNT_BATCH_SIZE = 10000
+
+
+def _count_subquery(queryset, field):
+    """COUNT(*) связанных строк для использования в UPDATE."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def post_counters():
+    return {
+        'likes_count': _count_subquery(
+            Post.likes.through.objects.all(), 'post'),
+        'comments_count': _count_subquery(Comment.objects.all(), 'post'),
+    }
+
+
+def user_counters():
+    return {
+        'posts_count': _count_subquery(Post.objects.all(), 'author'),
+        'followers_count': _count_subquery(Follow.objects.all(), 'author'),
+        'following_count': _count_subquery(Follow.objects.all(), 'user'),
+    }
+
+
+def _repair(queryset, counters, batch_size):
+    """Чинит счётчики в строках queryset, пачками по диапазону pk.
+
+    Возвращает число исправленных строк.
+    """
+    drifted = queryset.annotate(**{
+        f'actual_{name}': expression
+        for name, expression in counters.items()
+    }).exclude(**{
+        name: F(f'actual_{name}') for name in counters
+    })
+    bounds = queryset.order_by('pk').values_list('pk', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return 0
+    repaired = 0
+    for start in range(first, last + 1, batch_size):
+        batch = drifted.filter(pk__gte=start, pk__lt=start + batch_size)
+        with transaction.atomic():
+            pks = list(batch.values_list('pk', flat=True))
+            if pks:
+                repaired += queryset.model.objects.filter(
+                    pk__in=pks).update(**counters)
+    return repaired
+
+
+def recount_posts(queryset=None, batch_size=RECOUNT_BATCH_SIZE):
+    if queryset is None:
+        queryset = Post.objects.all()
+    return _repair(queryset.order_by(), post_counters(), batch_size)
+
+
+def recount_user_stats(user_ids=None, batch_size=RECOUNT_BATCH_SIZE):
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing.iterator()],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    stats = UserStats.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(pk__in=user_ids)
+    return _repair(stats, user_counters(), batch_size)
@@ -0,0 +1,70 @@
+"""ETag для условных GET лент и страницы поста.
+
+Функции передаются в django.views.decorators.http.condition: если ETag
+совпал с If-None-Match, Django отвечает 304 Not Modified, не вызывая
+представление. Поэтому ETag строится без рендера и почти без запросов:
+
+* ленты (главная, группа) — номера поколений POSTS, GROUPS и THUMBNAILS
+  из posts.cache, их сдвигают сигналы при любом изменении постов, лайков
+  и групп и пул миниатюр, когда миниатюра готова;
+* профиль — те же поколения, счётчики автора и подписка зрителя;
+* пост — время правки, счётчики лайков и комментариев поста и автора,
+  поколения GROUPS, THUMBNAILS и COMMENTS (число комментариев не
+  меняется, если один удалили, а другой добавили).
+
+В ETag всегда входят зритель (страницы для разных пользователей разные),
+его CSRF-токен и сессия (после нового входа или смены токена закэшированная
+браузером форма с устаревшим csrfmiddlewaretoken получила бы 403), адрес
+с параметрами (страница, курсор) и CACHE_VERSION, которую меняют при
+выкладке новых шаблонов.
+"""
+import hashlib
+
+from django.conf import settings
+from django.middleware.csrf import get_token
+
+from .cache import COMMENTS, GROUPS, POSTS, THUMBNAILS, get_generations
+from .models import Follow, Post, UserStats
+
+
+def make_etag(request, *parts):
+    user = request.user
+    # get_token() каждый раз солит токен заново; стабилен сам cookie,
+    # который get_token() создаёт, если его ещё нет.
+    get_token(request)
+    raw = '|'.join(str(part) for part in (
+        settings.CACHES['default'].get('VERSION', 1),
+        user.pk if user.is_authenticated else '-',
+        request.META['CSRF_COOKIE'],
+        request.session.session_key or '-',
+        request.get_full_path(),
+        *parts,
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed(request, *args, **kwargs):
+    return make_etag(request, *get_generations(POSTS, GROUPS, THUMBNAILS))
+
+
+def profile(request, username):
+    stats = UserStats.objects.filter(user__username=username).values_list(
+        'posts_count', 'followers_count', 'following_count').first()
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author__username=username).exists()
+    )
+    return make_etag(
+        request, *get_generations(POSTS, GROUPS, THUMBNAILS), stats,
+        following)
+
+
+def post_detail(request, post_id):
+    version = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'likes_count', 'comments_count',
+        'author__stats__posts_count', 'author__stats__followers_count',
+        'author__stats__following_count',
+    ).first()
+    return make_etag(
+        request, *get_generations(GROUPS, THUMBNAILS, COMMENTS), version)
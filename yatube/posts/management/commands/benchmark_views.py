@@ -0,0 +1,156 @@
+import json
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core import templates
+from posts import benchmarks
+
+
+# Замеры идут на отдельном локальном кэше, чтобы не сдвигать поколения
+# и не засорять общий кэш приложения.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.CompressedLocMemCache',
+        'LOCATION': 'benchmarks',
+        'KEY_PREFIX': 'benchmarks',
+    },
+}
+
+
+TEMPLATE_MODES = ('settings', 'plain', 'cached')
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт тестовую базу с синтетическими данными и замеряет p50/p95 '
+        'времени ответа, время рендера шаблонов, число запросов и размер '
+        'ответа основных представлений posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset',
+            choices=list(benchmarks.DATASETS),
+            default='10k',
+            help='Размер набора данных (число постов).',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Сколько раз выполнить каждый запрос.',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Замерить только эти сценарии.',
+        )
+        parser.add_argument(
+            '--templates',
+            choices=TEMPLATE_MODES,
+            default='settings',
+            help=(
+                'Загрузчик шаблонов: как в настройках, без кэша (plain) или '
+                'кэширующий (cached). Для сравнения рендера «до/после» '
+                'запустите plain с --output и cached с --baseline, оба '
+                'с --cold.'
+            ),
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Отдавать ленты и страницу поста потоком.',
+        )
+        parser.add_argument(
+            '--compress',
+            action='store_true',
+            help='Запрашивать сжатые ответы (Accept-Encoding: br, gzip).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Записать результаты в JSON-файл.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого запуска: сообщить о регрессиях.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Допустимое ухудшение p50 относительно baseline (доля).',
+        )
+
+    def handle(self, *args, **options):
+        creation = connection.creation
+        test_db = creation.create_test_db(verbosity=0, autoclobber=True)
+        overrides = {
+            'CACHES': BENCHMARK_CACHES,
+            'DEBUG': False,
+            'PERFORMANCE_SAMPLE_RATE': 1,
+            'PERFORMANCE_SERVER_TIMING': True,
+            'STREAMING_RENDER': options['stream'],
+        }
+        if options['templates'] != 'settings':
+            overrides['TEMPLATES'] = templates.with_loaders(
+                settings.TEMPLATES, options['templates'] == 'cached')
+        try:
+            with override_settings(**overrides):
+                report = self.run(options)
+        finally:
+            creation.destroy_test_db(test_db, verbosity=0)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.check_baseline(report, options)
+
+    def run(self, options):
+        started = time.monotonic()
+        shape = benchmarks.generate_dataset(
+            benchmarks.DATASETS[options['dataset']])
+        self.stdout.write(
+            f'Данные созданы за {time.monotonic() - started:.1f} с: {shape}')
+        results = benchmarks.run_benchmarks(
+            options['repeat'], options['cold'], options['only'],
+            'br, gzip' if options['compress'] else None)
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<17} p50 {result['p50_ms']:>8.2f} мс  "
+                f"p95 {result['p95_ms']:>8.2f} мс  "
+                f"первый байт {result['first_byte_p50_ms']:>8.2f} мс  "
+                f"шаблоны {result.get('template_p50_ms', 0):>7.2f} мс  "
+                f"запросов {result['queries']:>5}  "
+                f"байт {result['bytes']:>7}"
+            )
+        return {
+            'dataset': shape,
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'templates': options['templates'],
+            'stream': options['stream'],
+            'compress': options['compress'],
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': results,
+        }
+
+    def check_baseline(self, report, options):
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+        regressions = benchmarks.compare(
+            report['results'], baseline['results'], options['tolerance'])
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
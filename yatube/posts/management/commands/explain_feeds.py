@@ -0,0 +1,126 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts import timeline
+from posts.models import Comment, Follow, Post
+from yatube.utils import CursorPaginator
+
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+# Индексы из миграции 0021_feed_indexes: --compare временно удаляет их,
+# чтобы показать планы «до».
+FEED_INDEXES = (
+    'post_pub_date_id_idx',
+    'post_author_pub_date_idx',
+    'post_group_pub_date_idx',
+    'comment_post_created_idx',
+    'follow_author_user_idx',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы (EXPLAIN) и время запросов, которые выполняют '
+        'представления posts/views.py. С --compare сравнивает их с '
+        'планами без индексов из миграции 0021_feed_indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Показать планы до и после индексов (в откатываемой '
+                 'транзакции).',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз выполнить каждый запрос для замера времени.',
+        )
+
+    def feed_queries(self):
+        post = Post.objects.order_by('-pub_date', '-id').first()
+        user_id = post.author_id if post else 1
+        group_id = post.group_id if post and post.group_id else 1
+        post_id = post.pk if post else 1
+        keyset = CursorPaginator(
+            Post.objects.all(), settings.POSTS_QUANTITY,
+            ordering=FEED_ORDERING,
+        )._keyset_filter(
+            [post.pub_date if post else timezone.now(), post_id], False
+        )
+        window = settings.POSTS_QUANTITY + 1
+        feed = Post.objects.for_feed().order_by(*FEED_ORDERING)
+        return [
+            ('index', feed[:window]),
+            ('index (следующая страница)', feed.filter(keyset)[:window]),
+            ('group_posts', feed.filter(group_id=group_id)[:window]),
+            ('profile', feed.filter(author_id=user_id)[:window]),
+            ('profile (подписан ли)', Follow.objects.filter(
+                user_id=user_id, author_id=user_id)[:1]),
+            ('post_detail', Post.objects.select_related(
+                'author', 'group').filter(pk=post_id)),
+            ('post_detail (комментарии)', Comment.objects.filter(
+                post_id=post_id).select_related('author').order_by(
+                'created', 'id')[:settings.COMMENTS_QUANTITY + 1]),
+            ('follow_index', timeline.timeline_for(user_id).order_by(
+                *timeline.TIMELINE_ORDERING)[:window]),
+            ('post_create (рассылка подписчикам)', Follow.objects.filter(
+                author_id=user_id).values_list('user_id', flat=True)),
+        ]
+
+    def measure(self, queries, repeat):
+        results = {}
+        for label, queryset in queries:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = (
+                queryset.explain(),
+                statistics.median(timings) if timings else 0,
+            )
+        return results
+
+    def drop_feed_indexes(self):
+        with connection.cursor() as cursor:
+            for name in FEED_INDEXES:
+                cursor.execute(
+                    f'DROP INDEX IF EXISTS {connection.ops.quote_name(name)}'
+                )
+
+    def report(self, title, plan, median):
+        self.stdout.write(f'  {title} ({median:.2f} мс):')
+        for line in plan.splitlines():
+            self.stdout.write(f'    {line}')
+
+    def handle(self, *args, **options):
+        queries = self.feed_queries()
+        repeat = options['repeat']
+        if not options['compare']:
+            for label, (plan, median) in self.measure(
+                    queries, repeat).items():
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.report('план', plan, median)
+            return
+        # SQLite кэширует подготовленные запросы вместе с планом, поэтому
+        # каждая фаза начинается на свежем соединении.
+        connection.close()
+        with transaction.atomic():
+            self.drop_feed_indexes()
+            before = self.measure(queries, repeat)
+            transaction.set_rollback(True)
+        connection.close()
+        after = self.measure(queries, repeat)
+        for label, _ in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.report('до', *before[label])
+            self.report('после', *after[label])
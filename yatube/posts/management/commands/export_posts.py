@@ -0,0 +1,51 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в JSONL/CSV потоком.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Куда писать, «-» — стандартный вывод.')
+        parser.add_argument(
+            '--kind',
+            choices=list(transfer.MODELS),
+            default='posts',
+            help='Что выгружать.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            help='Формат файла; по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=transfer.IMPORT_BATCH_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        started = time.monotonic()
+        stream = sys.stdout if path == '-' else open(
+            path, 'w', newline='', encoding='utf-8')
+        try:
+            exported = transfer.export_records(
+                options['kind'], stream, fmt, options['batch_size'])
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.monotonic() - started
+        rate = exported / elapsed if elapsed else 0
+        self.stderr.write(
+            f'Выгружено {exported} записей за {elapsed:.1f} с '
+            f'({rate:.0f} записей/с).'
+        )
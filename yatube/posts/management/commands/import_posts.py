@@ -0,0 +1,91 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSONL/CSV пачками '
+        'через bulk_create. С --checkpoint прерванную загрузку можно '
+        'продолжить повторным запуском.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с записями, «-» — стандартный ввод.')
+        parser.add_argument(
+            '--kind',
+            choices=list(transfer.MODELS),
+            default='posts',
+            help='Что загружать.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            help='Формат файла; по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=transfer.IMPORT_BATCH_SIZE,
+            help='Сколько записей писать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл, куда после каждой пачки пишется число загруженных '
+                 'записей.',
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Создавать неизвестных авторов (без пароля).',
+        )
+        parser.add_argument(
+            '--no-refresh',
+            action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс '
+                 '(если загрузка идёт в несколько запусков).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        started = time.monotonic()
+
+        def report(stats):
+            elapsed = time.monotonic() - started
+            rate = stats.read / elapsed if elapsed else 0
+            self.stdout.write(
+                f'Прочитано {stats.read}, записано {stats.written}, '
+                f'пропущено {stats.skipped} ({rate:.0f} записей/с)'
+            )
+
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8')
+        try:
+            stats = transfer.import_records(
+                options['kind'],
+                transfer.read_records(stream, fmt),
+                batch_size=options['batch_size'],
+                checkpoint=options['checkpoint'],
+                create_users=options['create_users'],
+                on_batch=report,
+            )
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Ошибка в данных: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if stats.users_created:
+            self.stdout.write(f'Создано авторов: {stats.users_created}')
+        if stats.missing_groups:
+            self.stdout.write(self.style.WARNING(
+                f'Постов без найденной группы: {stats.missing_groups}'))
+        if not options['no_refresh']:
+            transfer.refresh_derived(options['kind'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'))
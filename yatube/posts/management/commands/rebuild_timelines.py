@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TIMELINE_BATCH_SIZE,
+            help='Сколько подписок читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = timeline.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано подписок: {rebuilt}.'
+        ))
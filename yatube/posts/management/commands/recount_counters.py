@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import (
+    RECOUNT_BATCH_SIZE, recount_posts, recount_user_stats
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики лайков, комментариев, '
+        'постов и подписок и чинит разошедшиеся значения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECOUNT_BATCH_SIZE,
+            help='Сколько строк проверять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = recount_posts(batch_size=batch_size)
+        users = recount_user_stats(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено постов: {posts}, пользователей: {users}.'
+        ))
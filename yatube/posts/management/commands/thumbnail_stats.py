@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, как часто метаданные миниатюр находятся в кэше, '
+        'в таблице sorl и как часто миниатюра ещё не готова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = thumbnails.get_stats()
+        total = sum(stats.values())
+        for name, count in stats.items():
+            share = count / total * 100 if total else 0
+            self.stdout.write(f'{name}: {count} ({share:.1f}%)')
+        if options['reset']:
+            thumbnails.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счётчики обнулены.'))
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models.functions import Greatest
 
 from .validators import validate_not_empty
 
@@ -19,6 +20,18 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN.
+
+        Число лайков хранится в самом посте (`likes_count`), поэтому
+        карточка поста (post_fragments.post_cards) не делает ни одного
+        дополнительного запроса, сколько бы постов ни было на странице.
+        """
+        return self.select_related('author', 'group')
+
+
 class Post(CreatedModel):
     text = models.TextField(
         validators=[validate_not_empty],
@@ -26,6 +39,9 @@ class Post(CreatedModel):
     pub_date = models.DateTimeField(
         auto_now_add=True,
         help_text='Publication date.')
+    updated = models.DateTimeField(
+        auto_now=True,
+        help_text='Date of the last edit.')
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -48,12 +64,88 @@ class Post(CreatedModel):
         User,
         related_name='blog_posts'
     )
+    likes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Денормализованное число лайков.'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Денормализованное число комментариев.'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('likes_count', 'comments_count')
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Счётчики меняются только атомарным UPDATE ... SET x = x + 1,
+        # обычное сохранение не должно затирать их устаревшим значением.
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def total_post_likes(self):
-        return self.likes.count()
+        return self.likes_count
+
+    def set_like(self, user, liked=None):
+        """Ставит (`liked=True`), снимает (`False`) или переключает лайк.
+
+        Работает напрямую с таблицей лайков: DELETE или INSERT одной
+        строки без загрузки всех лайкнувших, счётчик сдвигается атомарно.
+        Повторный запрос с тем же `liked` ничего не меняет, а гонку двух
+        INSERT разрешает уникальный индекс (post, user).
+        Возвращает пару (стоит ли лайк, изменилось ли что-то).
+        """
+        like = {'post_id': self.pk, 'user_id': user.pk}
+        likes = Post.likes.through.objects.filter(**like)
+        delta = 0
+        with transaction.atomic():
+            if liked is None:
+                delta = -likes.delete()[0]
+                liked = not delta
+            elif not liked:
+                delta = -likes.delete()[0]
+            if liked:
+                try:
+                    with transaction.atomic():
+                        Post.likes.through.objects.create(**like)
+                    delta = 1
+                except IntegrityError:
+                    delta = 0
+            if delta:
+                Post.objects.filter(pk=self.pk).update(
+                    likes_count=Greatest(models.F('likes_count') + delta, 0)
+                )
+        return liked, bool(delta)
+
+    @property
+    def cache_version(self):
+        """Версия карточки поста для ключей кэша."""
+        return str(self.updated.timestamp())
 
     def __str__(self):
         return self.text[:settings.SYMBOLS_SLICE]
@@ -75,6 +167,14 @@ class Comment(CreatedModel):
         validators=[validate_not_empty],
         help_text='Напишите Ваш комментарий.')
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -105,3 +205,97 @@ class Follow(models.Model):
                 name='unique_author_user_following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя для профиля."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user} stats'
+
+    @classmethod
+    def for_user(cls, user):
+        """Счётчики пользователя; при первом обращении считаются с нуля."""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            from .counters import recount_user_stats
+            recount_user_stats([user.pk])
+            return cls.objects.get(user=user)
+
+    @classmethod
+    def bump(cls, user_id, **deltas):
+        """Атомарно сдвигает счётчики: `bump(user.pk, posts_count=1)`.
+
+        Если строки ещё нет, ничего не делает — её посчитает `for_user`.
+        """
+        cls.objects.filter(user_id=user_id).update(**{
+            name: Greatest(models.F(name) + delta, 0)
+            for name, delta in deltas.items()
+        })
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост в «ящике» подписчика.
+
+    Заполняется при публикации поста (fan-out on write); посты популярных
+    авторов сюда не пишутся, а выбираются при чтении (posts.timeline).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_user_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author', '-pub_date'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} in {self.user} timeline'
@@ -0,0 +1,168 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite тексты постов лежат в виртуальной таблице FTS5 (миграция
+0022_post_search), сигналы обновляют её при сохранении и удалении поста,
+а команда reindex_search пересобирает с нуля. Результаты упорядочены по
+релевантности (bm25) и листаются курсором по паре (rank, rowid), так что
+дальние страницы не требуют OFFSET.
+
+На других СУБД поиск откатывается к `text__icontains` с обычной
+keyset-пагинацией по дате.
+"""
+import base64
+import binascii
+import json
+import re
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+
+from .models import Post
+from yatube.utils import paginate_posts
+
+
+FTS_TABLE = 'posts_post_fts'
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5.
+
+    Каждое слово берётся в кавычки (никаких операторов FTS5 из ввода),
+    слова объединяются через AND, последнее ищется по префиксу, чтобы
+    работал поиск по мере набора.
+    """
+    terms = TOKEN_RE.findall(query.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def index_post(post_id):
+    """Переиндексирует пост, беря текст прямо из posts_post."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table} WHERE id = %s',
+            [post_id],
+        )
+
+
+def unindex_post(post_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def reindex(batch_size):
+    """Пересобирает индекс из posts_post пачками по диапазону id.
+
+    Всё в одной транзакции: пока идёт пересборка, поиск видит старый
+    индекс, а не пустой.
+    """
+    if not is_available():
+        return 0
+    table = Post._meta.db_table
+    indexed = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'SELECT MIN(id), MAX(id) FROM {table}')
+        low, high = cursor.fetchone()
+        if low is None:
+            return 0
+        for start in range(low, high + 1, batch_size):
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {table} WHERE id >= %s AND id < %s',
+                [start, start + batch_size],
+            )
+            indexed += cursor.rowcount
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def encode_cursor(number, rank, post_id):
+    raw = json.dumps([number, rank, post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        number, rank, post_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode())
+        return max(int(number), 1), float(rank), int(post_id)
+    except (TypeError, ValueError, OverflowError, binascii.Error):
+        return None
+
+
+def matching_ids(query):
+    """Подзапрос с id всех постов, подходящих под запрос (для админки)."""
+    match = match_expression(query)
+    if match is None:
+        return None
+    return Post.objects.extra(
+        where=[f'id IN (SELECT rowid FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s)'],
+        params=[match],
+    ).values('id')
+
+
+def _ranked_ids(match, after, limit):
+    sql = f'SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    params = [match]
+    if after is not None:
+        rank, post_id = after
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [rank, rank, post_id]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_posts(query, cursor=None):
+    """Страница результатов поиска с атрибутами next_cursor/previous_cursor.
+
+    Назад курсор не ведёт: в результатах поиска есть «Первая» и
+    «Следующая», как в выдаче поисковиков.
+    """
+    if not is_available():
+        return paginate_posts(
+            Post.objects.for_feed().filter(text__icontains=query),
+            None, cursor,
+        )
+    per_page = settings.POSTS_QUANTITY
+    match = match_expression(query)
+    decoded = decode_cursor(cursor) if cursor else None
+    number, after = 1, None
+    if decoded is not None:
+        number, after = decoded[0], decoded[1:]
+    rows = _ranked_ids(match, after, per_page + 1) if match else []
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = Post.objects.for_feed().in_bulk([post_id for post_id, _ in rows])
+    items = [posts[post_id] for post_id, _ in rows if post_id in posts]
+    if not items:
+        number = 1
+    paginator = Paginator(items, per_page)
+    paginator.num_pages = number + 1 if has_next else number
+    page = paginator._get_page(items, number, paginator)
+    page.previous_cursor = page.next_cursor = None
+    if has_next:
+        post_id, rank = rows[-1]
+        page.next_cursor = encode_cursor(number + 1, rank, post_id)
+    return page
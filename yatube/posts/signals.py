@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save)
+from django.dispatch import receiver
+
+from . import cache, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _shift(queryset, field, delta):
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_image_changed(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._image_changed = True
+        return
+    old_image = Post.objects.filter(pk=instance.pk).values_list(
+        'image', flat=True).first()
+    instance._image_changed = old_image != instance.image.name
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    cache.bump(cache.POSTS)
+    search.index_post(instance.pk)
+    # Миниатюры нужны только новой картинке, а не каждой правке текста.
+    if created or getattr(instance, '_image_changed', True):
+        thumbnails.schedule(instance.image)
+    if created:
+        UserStats.bump(instance.author_id, posts_count=1)
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cache.bump(cache.POSTS)
+    search.unindex_post(instance.pk)
+    UserStats.bump(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    cache.bump(cache.GROUPS)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    cache.bump(cache.COMMENTS)
+    if created:
+        _shift(Post.objects.filter(pk=instance.post_id), 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cache.bump(cache.COMMENTS)
+    _shift(Post.objects.filter(pk=instance.post_id), 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        UserStats.bump(instance.user_id, following_count=1)
+        UserStats.bump(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    UserStats.bump(instance.user_id, following_count=-1)
+    UserStats.bump(instance.author_id, followers_count=-1)
+    timeline.trim(instance.user_id, instance.author_id)
+    # Автор только что перестал быть популярным.
+    if UserStats.objects.filter(
+        user_id=instance.author_id,
+        followers_count=settings.FANOUT_FOLLOWERS_LIMIT,
+    ).exists():
+        timeline.fan_out_recent(instance.author_id)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Сдвигает likes_count на число реально добавленных/удалённых строк.
+
+    При post_add Django передаёт только вставленные id; для удаления
+    существующие строки приходится посчитать до DELETE (pre_*).
+    '''
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        cache.bump(cache.POSTS)
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    if action == 'post_add':
+        rows = None
+        delta = 1
+    else:
+        rows = sender.objects.filter(
+            **{'user' if reverse else 'post': instance})
+        if action == 'pre_remove':
+            rows = rows.filter(
+                **{'post_id__in' if reverse else 'user_id__in': pk_set})
+        delta = -1
+    if reverse:
+        post_ids = pk_set if rows is None else rows.values('post_id')
+        _shift(Post.objects.filter(pk__in=post_ids), 'likes_count', delta)
+        return
+    changed = len(pk_set) if rows is None else rows.count()
+    if changed:
+        _shift(
+            Post.objects.filter(pk=instance.pk),
+            'likes_count',
+            delta * changed,
+        )
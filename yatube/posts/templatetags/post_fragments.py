@@ -0,0 +1,113 @@
+"""Кэшируемые фрагменты страниц с лентами постов.
+
+Карточки всей страницы читаются из кэша одним get_many, недостающие
+рендерятся и записываются одним set_many. В ключ карточки входит версия
+поста (время изменения, его двигает сохранение поста) и флаги ссылок,
+так что одна и та же карточка переиспользуется на главной, в группе и в
+профиле. Список групп кэшируется по поколению GROUPS, которое сдвигают
+сигналы Group.
+
+Кнопка лайка с csrf-токеном и счётчиком в кэш не попадает.
+
+В потоковом режиме недостающие карточки рендерятся лениво (LazyCard),
+каждая в своём блоке {% streamed %}, и записываются в кэш по одной.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import streaming
+from posts.cache import GROUPS, get_generations
+from posts.models import Group
+from .post_thumbnails import post_thumbnail
+
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_key(post, show_group_link, show_author_link, thumbnail):
+    # Имя автора, группа и готовность миниатюры видны в карточке, но
+    # версию поста не меняют, поэтому входят в ключ хэшем.
+    group = post.group
+    details = '\n'.join([
+        post.author.username,
+        group.slug if group else '',
+        group.title if group else '',
+        thumbnail.url if thumbnail else '',
+    ])
+    digest = hashlib.md5(details.encode()).hexdigest()
+    flags = f'{int(bool(show_group_link))}{int(bool(show_author_link))}'
+    return f'post_card:{post.pk}:{post.cache_version}:{flags}:{digest}'
+
+
+class LazyCard:
+    """Карточка, которая рендерится и кэшируется при выводе в шаблон."""
+
+    def __init__(self, key, context):
+        self.key = key
+        self.context = context
+        self.html = None
+
+    def __str__(self):
+        if self.html is None:
+            self.html = render_to_string(CARD_TEMPLATE, self.context)
+            cache.set(self.key, self.html, settings.POST_CARD_CACHE_TIMEOUT)
+        return self.html
+
+    __html__ = __str__
+
+
+@register.simple_tag
+def post_cards(posts, show_group_link=False, show_author_link=False):
+    """[(пост, HTML карточки)] для постов страницы.
+
+    В потоковом режиме (core.streaming) недостающие карточки рендерятся
+    не здесь, а при выводе, уже после отправки начала страницы.
+    """
+    posts = list(posts)
+    cards = []
+    for post in posts:
+        im = post_thumbnail(post)
+        key = card_key(post, show_group_link, show_author_link, im)
+        cards.append((post, im, key))
+    found = cache.get_many([key for _, _, key in cards])
+    lazy = streaming.current() is not None
+    missing = {}
+    result = []
+    for post, im, key in cards:
+        html = found.get(key)
+        if html is None:
+            context = {
+                'post': post,
+                'im': im,
+                'show_group_link': show_group_link,
+                'show_author_link': show_author_link,
+            }
+            if lazy:
+                result.append((post, LazyCard(key, context)))
+                continue
+            html = missing[key] = render_to_string(CARD_TEMPLATE, context)
+        result.append((post, mark_safe(html)))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    return result
+
+
+@register.simple_tag
+def group_links():
+    """Список ссылок на группы; без запроса к Group, пока он в кэше."""
+    generation, = get_generations(GROUPS)
+    key = f'group_links:{generation}'
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            'posts/includes/group_links.html',
+            {'groups': Group.objects.all()})
+        cache.set(key, html, settings.GROUP_LINKS_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,27 @@
+from django import template
+
+from posts import thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, alias='card'):
+    """Готовая миниатюра картинки поста или None.
+
+    Берёт результат thumbnails.resolve_thumbnails, если представление
+    уже нашло миниатюры для всей страницы. Если картинка есть, а
+    миниатюры ещё нет, она ставится в очередь, а шаблон показывает
+    заглушку.
+    """
+    resolved = getattr(post, 'resolved_thumbnails', {})
+    if alias in resolved:
+        return resolved[alias]
+    image = post.image
+    if not image:
+        return None
+    thumbnail = thumbnails.get_ready_thumbnail(image, alias)
+    if thumbnail is None:
+        thumbnails.schedule(image)
+    return thumbnail
@@ -0,0 +1,106 @@
+import gzip
+import json
+from http import HTTPStatus
+
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='-')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group)
+            for number in range(12)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_feeds_with_sparse_fields_and_cursor(self):
+        '''Ленты отдают только запрошенные поля и листаются курсором.'''
+        self.client.force_login(self.reader)
+        for name, args in (
+            ('posts:api_index', []),
+            ('posts:api_group_list', [self.group.slug]),
+            ('posts:api_profile', [self.author.username]),
+            ('posts:api_follow_index', []),
+        ):
+            with self.subTest(name=name):
+                url = reverse(name, args=args)
+                status, first = self.get_json(url, fields='id,author')
+                self.assertEqual(status, HTTPStatus.OK)
+                self.assertEqual(
+                    first['results'][0],
+                    {'id': self.posts[-1].pk, 'author': 'api_author'})
+                _, second = self.get_json(
+                    url, fields='id', cursor=first['next_cursor'])
+                ids = [item['id'] for item in
+                       first['results'] + second['results']]
+                self.assertEqual(
+                    ids, [post.pk for post in reversed(self.posts)])
+
+    def test_feed_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('posts:api_index'))
+
+    def test_errors(self):
+        status, data = self.get_json(
+            reverse('posts:api_index'), fields='id,password')
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', data['error'])
+        status, _ = self.get_json(reverse('posts:api_follow_index'))
+        self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+        status, _ = self.get_json(
+            reverse('posts:api_group_list', args=['missing']))
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+    def test_only_safe_methods(self):
+        self.client.force_login(self.reader)
+        for name, args in (
+            ('posts:api_index', []),
+            ('posts:api_group_list', [self.group.slug]),
+            ('posts:api_profile', [self.author.username]),
+            ('posts:api_follow_index', []),
+            ('posts:api_post_detail', [self.posts[0].pk]),
+        ):
+            url = reverse(name, args=args)
+            for method in ('post', 'put', 'delete'):
+                with self.subTest(name=name, method=method):
+                    response = getattr(self.client, method)(url)
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+            self.assertEqual(
+                self.client.head(url).status_code, HTTPStatus.OK)
+
+    def test_post_detail_with_comments(self):
+        post = self.posts[0]
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        status, data = self.get_json(
+            reverse('posts:api_post_detail', args=[post.pk]),
+            fields='text,comments')
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['comments'], 1)
+        self.assertEqual(
+            [comment['text'] for comment in data['comment_list']['results']],
+            ['Ответ'])
+        status, _ = self.get_json(
+            reverse('posts:api_post_detail', args=[0]))
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+    def test_responses_are_gzipped(self):
+        response = self.client.get(
+            reverse('posts:api_index'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 10)
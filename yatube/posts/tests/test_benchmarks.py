@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+from posts import benchmarks
+from posts.models import Post, TimelineEntry
+
+
+class BenchmarkTests(TestCase):
+    def test_small_dataset_benchmark(self):
+        '''Набор данных создаётся, и каждый сценарий отвечает без ошибок.'''
+        shape = benchmarks.generate_dataset(posts=30)
+        self.assertEqual(Post.objects.count(), shape['posts'])
+        self.assertTrue(TimelineEntry.objects.exists())
+        results = benchmarks.run_benchmarks(repeat=3)
+        self.assertEqual(
+            set(results), set(benchmarks.scenarios(self.client)))
+        for name, result in results.items():
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertTrue(
+                all(status < 400 for status in result['status']), name)
+
+    def test_compare_reports_regressions(self):
+        '''Рост числа запросов и времени выше допуска — регрессия.'''
+        baseline = {'index': {'queries': 3, 'p50_ms': 10}}
+        self.assertEqual(benchmarks.compare(
+            {'index': {'queries': 3, 'p50_ms': 11}}, baseline, 0.2), [])
+        self.assertEqual(len(benchmarks.compare(
+            {'index': {'queries': 4, 'p50_ms': 13}}, baseline, 0.2)), 2)
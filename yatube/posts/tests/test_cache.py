@@ -5,7 +5,8 @@ from django.test import TestCase
 from django.urls import reverse
 from django.core.cache import cache
 
-from posts.models import Post, Group
+from posts.models import Comment, Post, Group
+from posts.templatetags.post_fragments import group_links, post_cards
 
 
 User = get_user_model()
@@ -35,7 +36,8 @@ class PostIndexTestCache(TestCase):
         response = self.client.get(reverse('posts:index'))
         self.assertContains(
             response, self.post.text, status_code=HTTPStatus.OK)
-        Post.objects.all().delete()
+        # update() не шлёт сигналов, поэтому страница остаётся в кэше.
+        Post.objects.update(text='Changed_Text')
         response = self.client.get(reverse('posts:index'))
         self.assertContains(
             response, self.post.text, status_code=HTTPStatus.OK)
@@ -43,3 +45,127 @@ class PostIndexTestCache(TestCase):
         response = self.client.get(reverse('posts:index'))
         self.assertNotContains(
             response, self.post.text, status_code=HTTPStatus.OK)
+
+    def test_cache_invalidated_on_changes(self):
+        '''Создание, удаление поста и изменение группы сбрасывают кэш.'''
+        self.client.get(reverse('posts:index'))
+        new_post = Post.objects.create(author=self.user, text='New_Text')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, new_post.text)
+        new_post.delete()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, new_post.text)
+        self.group.title = 'Renamed_group'
+        self.group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Renamed_group')
+
+    def test_post_card_invalidated_on_edit(self):
+        '''Редактирование поста сбрасывает закэшированную карточку.'''
+        url = reverse('posts:profile', args=[self.user.username])
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Edited_Text'
+        post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Edited_Text')
+
+    def test_post_cards_rendered_from_cache(self):
+        '''Карточки страницы берутся из кэша без повторного рендера.'''
+        posts = list(Post.objects.for_feed())
+        first = post_cards(posts, show_group_link=True)
+        with self.assertNumQueries(0):
+            second = post_cards(posts, show_group_link=True)
+        self.assertEqual(first, second)
+        self.assertIn('все записи группы', first[0][1])
+        without_link = post_cards(posts, show_group_link=False)
+        self.assertNotIn('все записи группы', without_link[0][1])
+
+    def test_group_links_invalidated_by_group_changes(self):
+        '''Список групп кэшируется до изменения групп.'''
+        self.assertIn('Test_group', group_links())
+        with self.assertNumQueries(0):
+            group_links()
+        new_group = Group.objects.create(
+            title='New_group', slug='new-group', description='-')
+        self.assertIn(new_group.title, group_links())
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNotModified(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        return etag
+
+    def test_feeds_return_not_modified(self):
+        '''Ленты и профиль отвечают 304, пока данные не изменились.'''
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ]
+        etags = [self.assertNotModified(url) for url in urls]
+        Post.objects.create(author=self.user, text='Новый', group=self.group)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_etag_follows_comments_and_viewer(self):
+        '''ETag поста меняется с комментариями и зависит от зрителя.'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.assertNotModified(url)
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        self.client.logout()
+        Comment.objects.create(post=self.post, author=reader, text='Ответ')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Ответ')
+
+    def test_etag_changes_with_new_login(self):
+        '''После повторного входа страница с формой не отдаётся как 304.'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.force_login(self.user)
+        etag = self.assertNotModified(url)
+        self.client.logout()
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_etag_follows_replaced_comment(self):
+        '''Удалили один комментарий и добавили другой — ETag новый.'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Первый')
+        etag = self.assertNotModified(url)
+        comment.delete()
+        Comment.objects.create(post=self.post, author=self.user, text='Второй')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Второй')
+
+    def test_compressed_pages_keep_conditional_get(self):
+        '''Сжатый ответ получает слабый ETag, и по нему тоже будет 304.'''
+        url = reverse('posts:group_list', args=[self.group.slug])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counter_author')
+        cls.reader = User.objects.create_user(username='counter_reader')
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.author, text='Counted')
+        self.client.force_login(self.reader)
+
+    def test_like_and_comment_counters(self):
+        '''Лайки и комментарии меняют счётчики поста.'''
+        self.client.post(
+            reverse('posts:like_post', args=[self.post.pk]),
+            {'post_id': self.post.pk},
+            HTTP_REFERER='/')
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'comment'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+        self.client.post(
+            reverse('posts:like_post', args=[self.post.pk]),
+            {'post_id': self.post.pk},
+            HTTP_REFERER='/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_edit_does_not_overwrite_counters(self):
+        '''Сохранение поста не затирает счётчики устаревшим значением.'''
+        stale = Post.objects.get(pk=self.post.pk)
+        self.post.likes.add(self.reader)
+        stale.text = 'Edited'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_user_stats_follow_counters(self):
+        '''Подписка и новые посты меняют счётчики пользователей.'''
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        author_stats = UserStats.for_user(self.author)
+        reader_stats = UserStats.for_user(self.reader)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(UserStats.for_user(self.author).followers_count, 0)
+
+    def test_recount_counters_repairs_drift(self):
+        '''recount_counters чинит разошедшиеся счётчики.'''
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(likes_count=7, comments_count=0)
+        UserStats.objects.update(posts_count=0, followers_count=5)
+        call_command('recount_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(UserStats.for_user(self.author).posts_count, 1)
+        self.assertEqual(UserStats.for_user(self.author).followers_count, 1)
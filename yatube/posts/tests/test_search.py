@@ -0,0 +1,84 @@
+import base64
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='search_author')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_saved_posts_are_found(self):
+        '''Новый и изменённый пост находятся, удалённый — нет.'''
+        post = Post.objects.create(author=self.author, text='Ёлка в лесу')
+        self.assertEqual(list(self.search('ёлк')), [post])
+        post.text = 'Сосна в поле'
+        post.save()
+        self.assertEqual(list(self.search('ёлка')), [])
+        self.assertEqual(list(self.search('сосна поле')), [post])
+        post.delete()
+        self.assertEqual(list(self.search('сосна')), [])
+
+    def test_operators_in_query_are_plain_words(self):
+        '''Синтаксис FTS5 во вводе не ломает запрос.'''
+        post = Post.objects.create(author=self.author, text='NEAR "quoted"')
+        self.assertEqual(list(self.search('NEAR( "quoted* OR')), [])
+        self.assertEqual(list(self.search('near quoted')), [post])
+
+    @override_settings(POSTS_QUANTITY=2)
+    def test_results_are_ranked_and_paginated(self):
+        '''Сначала более релевантные посты; страницы листаются курсором.'''
+        relevant = Post.objects.create(
+            author=self.author, text='кот кот кот')
+        others = [
+            Post.objects.create(author=self.author, text=f'кот и пёс {i}')
+            for i in range(3)
+        ]
+        page = self.search('кот')
+        self.assertEqual(page[0], relevant)
+        found = list(page)
+        while page.has_next():
+            page = self.search('кот', cursor=page.next_cursor)
+            found += list(page)
+        self.assertCountEqual(found, [relevant, *others])
+
+    def test_tampered_cursor_returns_first_page(self):
+        post = Post.objects.create(author=self.author, text='кот')
+        for raw in ('[1e400,0,1]', '[2,0,1e400]', 'мусор'):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.subTest(raw=raw):
+                self.assertEqual(list(self.search('кот', cursor=cursor)),
+                                 [post])
+
+    def test_reindex_restores_index(self):
+        '''reindex_search заполняет индекс заново.'''
+        post = Post.objects.create(author=self.author, text='потерянный')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(list(self.search('потерянный')), [])
+        call_command('reindex_search', stdout=StringIO())
+        self.assertEqual(list(self.search('потерянный')), [post])
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке идёт по полнотекстовому индексу.'''
+        admin = User.objects.create_superuser(
+            'search_admin', 'admin@example.com', 'password')
+        post = Post.objects.create(author=self.author, text='админский')
+        Post.objects.create(author=self.author, text='другой')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'админ'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
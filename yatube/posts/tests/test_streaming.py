@@ -0,0 +1,73 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+class StreamingRenderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='streamer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='stream-group', description='-')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group)
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def pages(self, url):
+        '''Обычный ответ и куски потокового ответа.'''
+        # Сначала поток: карточек ещё нет в кэше, они рендерятся лениво.
+        streamed = self.client.get(url, {'stream': '1'})
+        chunks = [chunk.decode() for chunk in streamed.streaming_content]
+        plain = self.client.get(url, {'stream': '0'})
+        self.assertFalse(plain.streaming)
+        self.assertTrue(streamed.streaming)
+        return plain, streamed, chunks
+
+    def test_streamed_pages_match_plain_render(self):
+        '''Потоковые страницы совпадают с обычными, контекст доступен.'''
+        for url in (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.posts[0].pk]),
+        ):
+            with self.subTest(url=url):
+                plain, streamed, chunks = self.pages(url)
+                self.assertEqual(
+                    CSRF_RE.sub('', ''.join(chunks)),
+                    CSRF_RE.sub('', plain.content.decode()))
+                self.assertEqual(
+                    streamed.context['user'], plain.context['user'])
+
+    def test_page_head_is_sent_before_cards(self):
+        '''Первым куском уходит шапка страницы, карточки — следом.'''
+        url = reverse('posts:group_list', args=[self.group.slug])
+        _, _, chunks = self.pages(url)
+        self.assertIn('<head>', chunks[0])
+        self.assertNotIn('Пост', chunks[0])
+        cards = [chunk for chunk in chunks if 'Пост' in chunk]
+        self.assertEqual(len(cards), len(self.posts))
+        self.assertIn('csrfmiddlewaretoken', cards[0])
+        self.assertIn('</html>', chunks[-1])
+
+    @override_settings(STREAMING_RENDER=True)
+    def test_setting_enables_streaming(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertTrue(response.streaming)
+        self.assertFalse(
+            self.client.get(reverse('posts:follow_index'),
+                            {'stream': '0'}).streaming)
@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+PICTURE = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='thumb_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.author,
+            text='post with image',
+            image=SimpleUploadedFile(name, PICTURE, content_type='image/gif'),
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_thumbnail_is_ready_after_save(self):
+        '''Миниатюра готовится при сохранении поста и попадает в шаблон.'''
+        post = self.create_post('ready.gif')
+        thumbnail = thumbnails.get_ready_thumbnail(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, thumbnail.url)
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        '''Пока миниатюры нет, страница не режет картинку сама.'''
+        post = self.create_post('pending.gif')
+        self.assertIsNone(thumbnails.get_ready_thumbnail(post.image, 'card'))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, 'bg-light')
+        self.assertIsNone(thumbnails.get_ready_thumbnail(post.image, 'card'))
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_feed_resolves_thumbnails_in_one_batch(self):
+        '''Лента находит миниатюры всей страницы одним get_many.'''
+        posts = [self.create_post(f'batch{i}.gif') for i in range(3)]
+        cache.clear()
+        thumbnails.reset_stats()
+        with self.assertNumQueries(1):
+            thumbnails.resolve_thumbnails(posts)
+        self.assertEqual(
+            thumbnails.get_stats(), {'cache': 0, 'db': 3, 'miss': 0})
+        thumbnails.resolve_thumbnails(posts)
+        self.assertEqual(thumbnails.get_stats()['cache'], 3)
+        response = self.client.get(reverse('posts:index'))
+        for post in posts:
+            self.assertContains(
+                response, post.resolved_thumbnails['card'].url)
+
+    def test_pending_thumbnails_are_counted_as_misses(self):
+        '''Закэшированная отметка «миниатюры нет» — промах, а не попадание.'''
+        posts = [self.create_post(f'wait{i}.gif') for i in range(2)]
+        cache.clear()
+        thumbnails.reset_stats()
+        thumbnails.resolve_thumbnails(posts)
+        thumbnails.resolve_thumbnails(posts)
+        # До сброса счётчики живут в процессе, а не в общем кэше.
+        self.assertIsNone(cache.get('thumbnails:stats:miss'))
+        self.assertEqual(
+            thumbnails.get_stats(), {'cache': 0, 'db': 0, 'miss': 4})
+
+    def test_pages_are_invalidated_when_thumbnail_is_ready(self):
+        '''Готовая миниатюра сбрасывает кэш ленты и ETag страницы поста.'''
+        cache.clear()
+        post = self.create_post('late.gif')
+        detail_url = reverse('posts:post_detail', args=[post.pk])
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'bg-light')
+        etag = self.client.get(detail_url)['ETag']
+        thumbnails.generate(post.image.name)
+        thumbnail = thumbnails.get_ready_thumbnail(post.image, 'card')
+        self.assertContains(
+            self.client.get(reverse('posts:index')), thumbnail.url)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, thumbnail.url)
+        # Время правки поста готовность миниатюры не трогает.
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).updated, post.updated)
+
+    def test_text_edit_does_not_schedule_thumbnails(self):
+        '''Правка текста не ставит миниатюры в очередь, новая картинка — да.'''
+        post = self.create_post('edit.gif')
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            post.text = 'edited'
+            post.save()
+            schedule.assert_not_called()
+            post.image = SimpleUploadedFile(
+                'other.gif', PICTURE, content_type='image/gif')
+            post.save()
+        schedule.assert_called_once_with(post.image)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPoolTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_thumbnails_are_generated_in_pool_after_commit(self):
+        '''Пост из формы отдаётся сразу, миниатюра готовится в пуле.'''
+        author = User.objects.create_user(username='pool_author')
+        self.client.force_login(author)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'post with image',
+            'image': SimpleUploadedFile(
+                'pool.gif', PICTURE, content_type='image/gif'),
+        })
+        post = Post.objects.get(author=author)
+        thumbnails.drain()
+        thumbnail = thumbnails.get_ready_thumbnail(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, thumbnail.url)
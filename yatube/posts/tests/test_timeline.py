@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='timeline_reader')
+        cls.author = User.objects.create_user(username='timeline_author')
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def follow_feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        '''Новый пост попадает в ленты подписчиков при публикации.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='fan-out')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.follow_feed(), [post])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        '''Подписка добавляет старые посты автора, отписка убирает.'''
+        post = Post.objects.create(author=self.author, text='old post')
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.follow_feed(), [post])
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.follow_feed(), [])
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(FANOUT_FOLLOWERS_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        '''Посты популярного автора выбираются при чтении, без записи.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='celebrity')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.follow_feed(), [post])
+            self.client.get(reverse('posts:api_follow_index'))
+        self.assertFalse([
+            query for query in queries
+            if not query['sql'].lstrip().upper().startswith('SELECT')
+        ])
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+    def test_posts_stay_after_author_stops_being_celebrity(self):
+        '''Посты, вышедшие в «популярный» период, не пропадают из ленты.'''
+        other = User.objects.create_user(username='timeline_other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        with override_settings(FANOUT_FOLLOWERS_LIMIT=1):
+            follow = Follow.objects.create(user=other, author=self.author)
+            post = Post.objects.create(author=self.author, text='celebrity')
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists())
+            self.assertEqual(self.follow_feed(), [post])
+            follow.delete()
+            self.assertEqual(self.follow_feed(), [post])
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
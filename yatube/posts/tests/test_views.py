@@ -1,13 +1,15 @@
+import base64
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
 from posts.models import Post, Group, Comment, Follow
 from posts.forms import PostForm
+from posts.tests.utils import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -60,6 +62,102 @@ class PaginatorViewsTest(TestCase):
                     response.context['page_obj']),
                     self.second_page_posts_count)
 
+    def test_cursor_pages_posts(self):
+        '''Курсор next/previous ведёт на соседние страницы.'''
+        for url in self.paginate_pages:
+            with self.subTest(url):
+                first_page = self.client.get(url).context['page_obj']
+                self.assertFalse(first_page.has_previous())
+                response = self.client.get(
+                    url, {'cursor': first_page.next_cursor})
+                second_page = response.context['page_obj']
+                self.assertEqual(
+                    len(second_page), self.second_page_posts_count)
+                self.assertFalse(second_page.has_next())
+                self.assertFalse(
+                    set(first_page.object_list)
+                    & set(second_page.object_list)
+                )
+                response = self.client.get(
+                    url, {'cursor': second_page.previous_cursor})
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    list(first_page))
+
+    @override_settings(POSTS_QUANTITY=3)
+    def test_cursor_walk_back_over_many_pages(self):
+        '''Назад по курсорам — те же страницы с теми же номерами.'''
+        url = self.paginate_pages[1]
+        pages = [self.client.get(url).context['page_obj']]
+        while pages[-1].has_next():
+            response = self.client.get(url, {'cursor': pages[-1].next_cursor})
+            pages.append(response.context['page_obj'])
+        self.assertEqual(len(pages), 5)
+        self.assertEqual([page.number for page in pages], [1, 2, 3, 4, 5])
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            response = self.client.get(url, {'cursor': page.previous_cursor})
+            page = response.context['page_obj']
+            self.assertEqual(page.number, expected.number)
+            self.assertEqual(list(page), list(expected))
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        tampered = [
+            'not-a-cursor',
+            '["n",2,[null,null]]',
+            '["p",1e400,["2020-01-01T00:00:00+00:00",1]]',
+        ]
+        for cursor in tampered:
+            if cursor.startswith('['):
+                cursor = base64.urlsafe_b64encode(cursor.encode()).decode()
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/', {'cursor': cursor})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    len(response.context['page_obj']),
+                    settings.POSTS_QUANTITY)
+
+
+class FeedQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='budget_user')
+        cls.author = User.objects.create_user(username='budget_author')
+        cls.group = Group.objects.create(
+            title='Budget_group',
+            slug='budget-group',
+            description='Budget-group-description',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(settings.POSTS_QUANTITY + 1):
+            post = Post.objects.create(
+                author=cls.author,
+                text=f'Budget text {i}',
+                group=cls.group,
+            )
+            post.likes.add(cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def test_feed_pages_fit_query_budget(self):
+        '''Число запросов ленты не зависит от числа постов на странице.'''
+        budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', args=[self.group.slug]): 4,
+            reverse('posts:profile', args=[self.author.username]): 8,
+            reverse('posts:follow_index'): 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(budget, url)
+                self.assertEqual(
+                    len(response.context['page_obj']),
+                    settings.POSTS_QUANTITY)
+
 
 class PostViewsTests(TestCase):
     @classmethod
@@ -184,6 +282,29 @@ class PostCommentsTests(TestCase):
             response, f'/posts/{self.post.id}/'
         )
 
+    @override_settings(COMMENTS_QUANTITY=2)
+    def test_comments_are_paginated(self):
+        '''Комментарии выводятся порциями, следующая — через JSON.'''
+        comments = Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'comment {i}')
+            for i in range(5)
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        page = response.context['comments']
+        self.assertEqual([c.text for c in page], ['comment 0', 'comment 1'])
+        texts = []
+        cursor = page.next_cursor
+        while cursor:
+            with self.assertNumQueries(2):
+                data = self.authorized_client.get(
+                    reverse('posts:post_comments', args=[self.post.id]),
+                    {'cursor': cursor},
+                ).json()
+            texts += [comment['text'] for comment in data['comments']]
+            cursor = data['next_cursor']
+        self.assertEqual(texts, [c.text for c in comments[2:]])
+
 
 class PostFollowTests(TestCase):
     @classmethod
@@ -222,3 +343,40 @@ class PostFollowTests(TestCase):
         response = self.client.get(reverse('posts:follow_index'))
         follow = response.context['page_obj']
         self.assertIn(post_follow, follow)
+
+
+class LikePostTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='like_username')
+        cls.post = Post.objects.create(author=cls.user, text='like me')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('posts:like_post', args=[self.post.pk])
+
+    def test_like_toggle_json(self):
+        '''AJAX-лайк отвечает JSON с новым числом лайков.'''
+        response = self.client.post(
+            self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(
+            response.json(),
+            {'post_id': self.post.pk, 'liked': True, 'likes_count': 1})
+        response = self.client.post(
+            self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['likes_count'], 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_explicit_like_is_idempotent(self):
+        '''Повторный action=like не снимает лайк и не двигает счётчик.'''
+        for _ in range(2):
+            self.client.post(self.url, {'action': 'like'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.likes.count(), 1)
+
+    def test_like_redirects_back(self):
+        response = self.client.post(self.url)
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[self.post.pk]))
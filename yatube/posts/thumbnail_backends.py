@@ -0,0 +1,74 @@
+"""Бэкенд и key-value store sorl-thumbnail для миниатюр постов.
+
+Модуль подключается настройками THUMBNAIL_BACKEND и THUMBNAIL_KVSTORE;
+sorl импортирует его при первом обращении к миниатюрам, а не при старте
+процесса.
+"""
+from sorl.thumbnail import base, default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .thumbnails import record_stats
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Key-value store sorl с пакетным чтением.
+
+    Промахи кэша дочитываются из таблицы sorl одним запросом и сразу
+    кладутся в кэш, в том числе отметка «миниатюры нет».
+    """
+
+    def get_many(self, image_files):
+        """Словарь {ключ ImageFile: ImageFile или None}."""
+        raw_keys = {
+            add_prefix(image_file.key): image_file.key
+            for image_file in image_files
+        }
+        found = self.cache.get_many(list(raw_keys))
+        missing = [key for key in raw_keys if key not in found]
+        stored = {}
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing).values_list('key', 'value'))
+            loaded = {
+                key: stored.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(
+                loaded, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(loaded)
+        result = {
+            key: None if found[raw_key] == cached_db_kvstore.EMPTY_VALUE
+            else deserialize_image_file(found[raw_key])
+            for raw_key, key in raw_keys.items()
+        }
+        # Отметка «миниатюры нет» из кэша — промах, а не попадание.
+        misses = sum(value is None for value in result.values())
+        record_stats(
+            cache=len(raw_keys) - len(stored) - misses,
+            db=len(stored),
+            miss=misses,
+        )
+        return result
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """Бэкенд sorl, который умеет назвать миниатюру, не создавая её."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile будущей миниатюры: имя без обращения к хранилищу."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
@@ -0,0 +1,203 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Раньше sorl-thumbnail резал картинку прямо во время первого рендера
+ленты. Теперь после сохранения поста все размеры из POST_THUMBNAILS
+готовятся в пуле потоков, а шаблоны только читают готовую миниатюру
+из key-value store sorl и, пока её нет, показывают заглушку.
+
+Миниатюры всей страницы ленты ищутся одним запросом get_many к общему
+кэшу (resolve_thumbnails), а не отдельным запросом на каждый пост.
+
+sorl импортируется только при первой работе с картинкой: бэкенд и
+key-value store лежат в posts.thumbnail_backends, а sorl загружает их
+лениво по THUMBNAIL_BACKEND и THUMBNAIL_KVSTORE.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from .cache import THUMBNAILS, bump
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_futures = set()
+
+# Счётчики: cache — метаданные нашлись в кэше, db — только в таблице sorl,
+# miss — миниатюра ещё не готова. Процесс копит их у себя и раз в
+# THUMBNAIL_STATS_FLUSH_INTERVAL секунд (и при выходе) прибавляет к общим
+# счётчикам в кэше, чтобы не писать в кэш на каждом рендере ленты.
+STATS = ('cache', 'db', 'miss')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+_stats_flushed = time.monotonic()
+
+
+def _stats_key(name):
+    return f'thumbnails:stats:{name}'
+
+
+def record_stats(**counts):
+    with _stats_lock:
+        _stats.update(counts)
+
+
+def flush_stats():
+    """Прибавляет счётчики процесса к общим счётчикам в кэше."""
+    global _stats_flushed
+    with _stats_lock:
+        counts = {name: _stats[name] for name in STATS if _stats[name]}
+        _stats.clear()
+        _stats_flushed = time.monotonic()
+    for name, count in counts.items():
+        try:
+            cache.incr(_stats_key(name), count)
+        except ValueError:
+            cache.set(_stats_key(name), count, None)
+
+
+def flush_stats_if_due(**kwargs):
+    """Обработчик request_finished: сброс не чаще раза в интервал."""
+    interval = settings.THUMBNAIL_STATS_FLUSH_INTERVAL
+    if time.monotonic() - _stats_flushed >= interval:
+        flush_stats()
+
+
+def get_stats():
+    flush_stats()
+    found = cache.get_many([_stats_key(name) for name in STATS])
+    return {name: found.get(_stats_key(name), 0) for name in STATS}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+    cache.delete_many([_stats_key(name) for name in STATS])
+
+
+atexit.register(lambda: flush_stats() if _stats else None)
+
+
+def _thumbnail_file(image, alias):
+    from sorl.thumbnail import default
+
+    geometry, options = settings.POST_THUMBNAILS[alias]
+    return default.backend.get_thumbnail_file(image, geometry, **options)
+
+
+def get_ready_thumbnail(image, alias):
+    from sorl.thumbnail import default
+
+    if not image:
+        return None
+    return default.kvstore.get(_thumbnail_file(image, alias))
+
+
+def resolve_thumbnails(posts, alias='card'):
+    """Находит миниатюры для всех постов страницы одним запросом к кэшу.
+
+    Результат сохраняется в post.resolved_thumbnails[alias], его читает
+    тег {% post_thumbnail %}. Неготовые миниатюры ставятся в очередь.
+    """
+    from sorl.thumbnail import default
+
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    files = {post.pk: _thumbnail_file(post.image, alias) for post in posts}
+    ready = default.kvstore.get_many(files.values())
+    for post in posts:
+        thumbnail = ready[files[post.pk].key]
+        if thumbnail is None:
+            schedule(post.image)
+        if not hasattr(post, 'resolved_thumbnails'):
+            post.resolved_thumbnails = {}
+        post.resolved_thumbnails[alias] = thumbnail
+
+
+def generate(name):
+    """Создаёт все размеры миниатюр для картинки `name`."""
+    from sorl.thumbnail import default
+
+    try:
+        for geometry, options in settings.POST_THUMBNAILS.values():
+            default.backend.get_thumbnail(name, geometry, **options)
+        # Страницы, отрендеренные с заглушкой, лежат в кэше страниц и
+        # отвечают 304 по ETag; поколение THUMBNAILS входит в оба ключа.
+        bump(THUMBNAILS)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+    finally:
+        _pending.discard(name)
+
+
+def _generate_in_worker(name):
+    try:
+        generate(name)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def _claim(name):
+    """False, если картинка уже ждёт своей очереди."""
+    with _executor_lock:
+        if name in _pending:
+            return False
+        _pending.add(name)
+        return True
+
+
+def _submit(name):
+    if _claim(name):
+        future = _get_executor().submit(_generate_in_worker, name)
+        _futures.add(future)
+        future.add_done_callback(_futures.discard)
+
+
+def drain(timeout=None):
+    """Ждёт, пока пул доделает уже поставленные миниатюры.
+
+    Нужна тестам (и shell), которые после запроса удаляют MEDIA_ROOT или
+    проверяют готовые файлы; веб-воркер пул не ждёт.
+    """
+    wait(list(_futures), timeout)
+
+
+def schedule(image):
+    """Ставит картинку в очередь на подготовку миниатюр.
+
+    Повторная постановка уже ждущей картинки ничего не делает. Миниатюры
+    готовятся в пуле из THUMBNAIL_WORKERS потоков после коммита
+    транзакции; при THUMBNAIL_WORKERS = 0 — сразу (удобно в тестах).
+    """
+    if not image:
+        return
+    name = image.name
+    if not settings.THUMBNAIL_WORKERS:
+        if _claim(name):
+            generate(name)
+        return
+    # Поток должен увидеть и сам пост, поэтому только после коммита.
+    transaction.on_commit(lambda: _submit(name))
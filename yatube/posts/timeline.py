@@ -0,0 +1,122 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается по лентам подписчиков автора; у «популярных»
+авторов (больше FANOUT_FOLLOWERS_LIMIT подписчиков) рассылка слишком
+дорогая, и их посты подмешиваются в ленту читателя при чтении
+(fan-out on read), ничего не записывая. Когда автор перестаёт быть
+популярным, его последние посты раскладываются по лентам подписчиков
+(fan_out_recent), иначе они пропали бы из лент.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+TIMELINE_ORDERING = ('-pub_date', '-id')
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def is_celebrity(author):
+    stats = UserStats.for_user(author)
+    return stats.followers_count > settings.FANOUT_FOLLOWERS_LIMIT
+
+
+def _fan_out(author_id, posts):
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for follower_id in follower_ids.iterator():
+        batch.extend(_entry(follower_id, post) for post in posts)
+        if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+            _insert(batch)
+            batch = []
+    _insert(batch)
+
+
+def _recent_posts(author_id, since=None):
+    posts = Post.objects.filter(author_id=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    return posts.order_by('-pub_date', '-id').only(
+        'pk', 'author_id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_SIZE]
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author):
+        return
+    _fan_out(post.author_id, [post])
+
+
+def fan_out_recent(author_id):
+    """Кладёт последние посты автора в ленты всех его подписчиков.
+
+    Вызывается, когда автор перестаёт быть популярным: его посты больше
+    не подмешиваются при чтении и без этого пропали бы из лент.
+    """
+    _fan_out(author_id, list(_recent_posts(author_id)))
+
+
+def backfill(user_id, author_id, since=None):
+    """Добавляет в ленту последние посты автора (новее `since`)."""
+    _insert([
+        _entry(user_id, post) for post in _recent_posts(author_id, since)
+    ])
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def celebrity_author_ids(user):
+    """Популярные авторы, на которых подписан пользователь."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FANOUT_FOLLOWERS_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+def timeline_for(user):
+    """Посты ленты подписок пользователя.
+
+    Разложенные в TimelineEntry посты плюс посты популярных авторов:
+    их лента не хранит, они выбираются тем же запросом.
+    """
+    in_timeline = Q(pk__in=TimelineEntry.objects.filter(
+        user=user).values('post_id'))
+    author_ids = celebrity_author_ids(user)
+    if author_ids:
+        in_timeline |= Q(author_id__in=author_ids)
+    return Post.objects.for_feed().filter(in_timeline)
+
+
+def rebuild(batch_size=None):
+    """Пересобирает все ленты с нуля по текущим подпискам."""
+    TimelineEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    rebuilt = 0
+    for user_id, author_id in follows.iterator(
+            chunk_size=batch_size or settings.TIMELINE_BATCH_SIZE):
+        backfill(user_id, author_id)
+        rebuilt += 1
+    return rebuilt
@@ -0,0 +1,328 @@
+"""Массовая загрузка и выгрузка постов, комментариев и подписок.
+
+Записи читаются потоком (JSONL или CSV) и пишутся в базу пачками через
+bulk_create, каждая пачка — в своей транзакции. Авторы и группы пачки
+находятся одним запросом на пачку. После каждой пачки номер последней
+записи сохраняется в файл-чекпоинт, так что прерванный импорт
+продолжается с места остановки; записи с id (и подписки) при повторе
+не задваиваются благодаря ignore_conflicts. В статистику попадают только
+действительно вставленные строки: уже существующие ключи пачки
+находятся одним запросом перед вставкой. После загрузки с явными id
+последовательности первичных ключей (PostgreSQL) сдвигаются за
+максимальный id.
+
+bulk_create обходит сигналы, поэтому счётчики, ленты подписок, поисковый
+индекс и поколения кэша после импорта пересчитываются целиком
+(refresh_derived).
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+IMPORT_BATCH_SIZE = 5000
+
+FORMATS = ('jsonl', 'csv')
+
+# Поля записи и соответствующие им пути для values_list при выгрузке.
+FIELDS = {
+    'posts': {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    },
+    'comments': {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    'follows': {
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+
+MODELS = {'posts': Post, 'comments': Comment, 'follows': Follow}
+
+# Поля, по которым ignore_conflicts отбрасывает уже загруженные строки.
+UNIQUE_FIELDS = {
+    User: ('username',),
+    Post: ('id',),
+    Comment: ('id',),
+    Follow: ('user_id', 'author_id'),
+}
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.skipped = 0
+        self.users_created = 0
+        self.missing_groups = 0
+
+
+def read_records(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Неверная дата: {value!r}')
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+@contextmanager
+def preserve_dates(model):
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def insert_new(model, objects):
+    """bulk_create с ignore_conflicts; возвращает число вставленных строк.
+
+    ignore_conflicts молча пропускает строки с уже занятым ключом, а
+    bulk_create всё равно возвращает все объекты, поэтому занятые ключи
+    ищутся заранее (в той же транзакции).
+    """
+    fields = UNIQUE_FIELDS[model]
+    keys = [tuple(getattr(obj, name) for name in fields) for obj in objects]
+    known = {key for key in keys if None not in key}
+    if known:
+        known &= set(model.objects.filter(**{
+            f'{name}__in': {key[index] for key in known}
+            for index, name in enumerate(fields)
+        }).values_list(*fields))
+    model.objects.bulk_create(objects, ignore_conflicts=True)
+    inserted = 0
+    for key in keys:
+        if None in key:
+            inserted += 1
+        elif key not in known:
+            known.add(key)
+            inserted += 1
+    return inserted
+
+
+def reset_sequences(model):
+    """Сдвигает последовательность id за максимальный (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def resolve_users(names, create, stats):
+    """{username: id} для всех имён пачки одним запросом."""
+    names = set(filter(None, names))
+    found = dict(User.objects.filter(
+        username__in=names).values_list('username', 'id'))
+    missing = names - found.keys()
+    if missing and create:
+        stats.users_created += insert_new(User, [
+            User(username=name, password=make_password(None))
+            for name in missing
+        ])
+        found.update(User.objects.filter(
+            username__in=missing).values_list('username', 'id'))
+    return found
+
+
+def build_posts(batch, create_users, stats):
+    users = resolve_users(
+        (record.get('author') for record in batch), create_users, stats)
+    groups = dict(Group.objects.filter(slug__in={
+        record['group'] for record in batch if record.get('group')
+    }).values_list('slug', 'id'))
+    objects = []
+    for record in batch:
+        author_id = users.get(record.get('author'))
+        if author_id is None:
+            stats.skipped += 1
+            continue
+        group_id = groups.get(record.get('group'))
+        if record.get('group') and group_id is None:
+            stats.missing_groups += 1
+        pub_date = parse_date(record.get('pub_date'))
+        objects.append(Post(
+            id=record.get('id') or None,
+            text=record['text'],
+            pub_date=pub_date,
+            created=pub_date,
+            updated=pub_date,
+            author_id=author_id,
+            group_id=group_id,
+            image=record.get('image') or '',
+        ))
+    return objects
+
+
+def build_comments(batch, create_users, stats):
+    users = resolve_users(
+        (record.get('author') for record in batch), create_users, stats)
+    posts = set(Post.objects.filter(id__in={
+        int(record['post']) for record in batch
+    }).values_list('id', flat=True))
+    objects = []
+    for record in batch:
+        author_id = users.get(record.get('author'))
+        if author_id is None or int(record['post']) not in posts:
+            stats.skipped += 1
+            continue
+        objects.append(Comment(
+            id=record.get('id') or None,
+            post_id=int(record['post']),
+            author_id=author_id,
+            text=record['text'],
+            created=parse_date(record.get('created')),
+        ))
+    return objects
+
+
+def build_follows(batch, create_users, stats):
+    users = resolve_users(
+        [record.get(key) for record in batch for key in ('user', 'author')],
+        create_users, stats)
+    objects = []
+    for record in batch:
+        user_id = users.get(record.get('user'))
+        author_id = users.get(record.get('author'))
+        if user_id is None or author_id is None or user_id == author_id:
+            stats.skipped += 1
+            continue
+        objects.append(Follow(user_id=user_id, author_id=author_id))
+    return objects
+
+
+BUILDERS = {
+    'posts': build_posts,
+    'comments': build_comments,
+    'follows': build_follows,
+}
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f)['done']
+
+
+def write_checkpoint(path, done):
+    if not path:
+        return
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'done': done}, f)
+    os.replace(tmp_path, path)
+
+
+def import_records(kind, records, batch_size=IMPORT_BATCH_SIZE,
+                   checkpoint=None, create_users=False, on_batch=None):
+    """Загружает записи `kind` пачками; возвращает ImportStats.
+
+    Первые записи, отмеченные в `checkpoint` как загруженные,
+    пропускаются. `on_batch(stats)` вызывается после каждой пачки.
+    """
+    model = MODELS[kind]
+    build = BUILDERS[kind]
+    stats = ImportStats()
+    done = read_checkpoint(checkpoint)
+    stats.read = done
+    records = islice(records, done, None)
+    with preserve_dates(model):
+        for batch in batches(records, batch_size):
+            with transaction.atomic():
+                objects = build(batch, create_users, stats)
+                stats.written += insert_new(model, objects)
+            stats.read += len(batch)
+            write_checkpoint(checkpoint, stats.read)
+            if on_batch is not None:
+                on_batch(stats)
+    reset_sequences(model)
+    return stats
+
+
+def refresh_derived(kind):
+    """Пересчитывает то, что при обычной работе обновляют сигналы."""
+    if kind in ('posts', 'comments'):
+        counters.recount_posts()
+    if kind in ('posts', 'follows'):
+        counters.recount_user_stats()
+        timeline.rebuild()
+    if kind == 'posts':
+        search.reindex(IMPORT_BATCH_SIZE)
+    cache.bump(cache.POSTS)
+
+
+def export_records(kind, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Выгружает все записи `kind` потоком; возвращает их число."""
+    fields = FIELDS[kind]
+    rows = MODELS[kind].objects.order_by('pk').values_list(
+        *fields.values()).iterator(chunk_size=batch_size)
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=list(fields))
+        writer.writeheader()
+    exported = 0
+    for row in rows:
+        record = {
+            key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in zip(fields, row)
+        }
+        if writer is not None:
+            writer.writerow(record)
+        else:
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        exported += 1
+    return exported
@@ -11,12 +11,18 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.search_posts, name='search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -29,4 +35,21 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('like/<int:pk>', views.like_post, name='like_post'),
+    path('api/posts/', views.api_index, name='api_index'),
+    path(
+        'api/posts/<int:post_id>/',
+        views.api_post_detail,
+        name='api_post_detail'
+    ),
+    path(
+        'api/group/<slug:slug>/',
+        views.api_group_posts,
+        name='api_group_list'
+    ),
+    path(
+        'api/profile/<str:username>/',
+        views.api_profile,
+        name='api_profile'
+    ),
+    path('api/follow/', views.api_follow_index, name='api_follow_index'),
 ]
@@ -1,76 +1,138 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
 from django.conf import settings
-from django.http import HttpResponseRedirect
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_POST, require_safe
 
-from .models import Post, Group, User, Follow
+from core import streaming
+from .models import Comment, Post, Group, User, Follow, UserStats
 from .forms import PostForm, CommentForm
-from yatube.utils import paginate_posts
+from . import api, etags, search, thumbnails, timeline
+from .cache import GROUPS, POSTS, THUMBNAILS, bump, cache_page_versioned
+from yatube.utils import paginate_comments, paginate_posts
 
 
-@cache_page(settings.CACHE_TIME_IN_SEC, key_prefix='index_page')
+LIKE_ACTIONS = {'like': True, 'unlike': False}
+
+
+@condition(etag_func=etags.feed)
+@cache_page_versioned(
+    settings.INDEX_CACHE_TIMEOUT, 'index_page', (POSTS, GROUPS, THUMBNAILS))
 def index(request):
     '''Главная страница'''
+    # Потоком не отдаётся: потоковые ответы cache_page не сохраняет, а
+    # главная почти всегда берётся из кэша целиком.
     template = 'posts/index.html'
-    posts = Post.objects.all()
-    groups = Group.objects.all()
+    posts = Post.objects.for_feed()
     page_number = request.GET.get('page')
-    page_obj = paginate_posts(posts, page_number)
+    cursor = request.GET.get('cursor')
+    page_obj = paginate_posts(posts, page_number, cursor)
+    thumbnails.resolve_thumbnails(page_obj)
     context = {
         'page_obj': page_obj,
-        'groups': groups,
     }
     return render(request, template, context)
 
 
+@condition(etag_func=etags.feed)
 def group_posts(request, slug):
     '''Страница группы'''
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_number = request.GET.get('page')
-    page_obj = paginate_posts(posts, page_number)
+    cursor = request.GET.get('cursor')
+    page_obj = paginate_posts(posts, page_number, cursor)
+    thumbnails.resolve_thumbnails(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    return streaming.render_page(request, template, context)
 
 
+@condition(etag_func=etags.profile)
 def profile(request, username):
     '''Профиль пользователя.'''
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
+    posts = Post.objects.for_feed().filter(author=author)
     page_number = request.GET.get('page')
-    page_obj = paginate_posts(posts, page_number)
+    cursor = request.GET.get('cursor')
+    page_obj = paginate_posts(posts, page_number, cursor)
+    thumbnails.resolve_thumbnails(page_obj)
     following = False
     if request.user.is_authenticated and request.user != author:
         following = Follow.objects.filter(
             user=request.user, author=author).exists()
     context = {
         'author': author,
+        'author_stats': UserStats.for_user(author),
         'page_obj': page_obj,
         'following': following
     }
+    return streaming.render_page(request, template, context)
+
+
+def search_posts(request):
+    '''Поиск по текстам постов.'''
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = search.search_posts(query, request.GET.get('cursor'))
+        thumbnails.resolve_thumbnails(page_obj)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
     return render(request, template, context)
 
 
+@condition(etag_func=etags.post_detail)
 def post_detail(request, post_id):
     '''Страница просмотра поста.'''
     template = 'posts/post_detail.html'
-    posts = get_object_or_404(Post, id=post_id)
+    posts = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
     total_likes = posts.total_post_likes()
     form = CommentForm()
-    comments = posts.comments.all()
+    comments = paginate_comments(
+        posts.comments.select_related('author'),
+        request.GET.get('comments_cursor'),
+    )
     context = {
         'posts': posts,
+        'author_stats': UserStats.for_user(posts.author),
         'form': form,
         'comments': comments,
         'total_likes': total_likes,
     }
-    return render(request, template, context)
+    return streaming.render_page(request, template, context)
+
+
+def post_comments(request, post_id):
+    '''Следующая порция комментариев к посту в JSON.'''
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = paginate_comments(
+        post.comments.select_related('author'),
+        request.GET.get('cursor'),
+    )
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'author_url': reverse(
+                    'posts:profile', args=[comment.author.username]),
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next_cursor': comments.next_cursor,
+    })
 
 
 @login_required
@@ -131,11 +193,14 @@ def follow_index(request):
     '''Функция страницы, куда будут выведены посты авторов,
     на которых подписан текущий пользователь.'''
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = timeline.timeline_for(request.user)
     page_number = request.GET.get('page')
-    page_obj = paginate_posts(posts, page_number)
+    cursor = request.GET.get('cursor')
+    page_obj = paginate_posts(
+        posts, page_number, cursor, ordering=timeline.TIMELINE_ORDERING)
+    thumbnails.resolve_thumbnails(page_obj)
     context = {'page_obj': page_obj}
-    return render(request, template, context)
+    return streaming.render_page(request, template, context)
 
 
 @login_required
@@ -157,10 +222,74 @@ def profile_unfollow(request, username):
 
 
 @login_required
+@require_POST
 def like_post(request, pk):
-    post = get_object_or_404(Post, id=request.POST.get('post_id'))
-    if request.user in post.likes.all():
-        post.likes.remove(request.user)
-    else:
-        post.likes.add(request.user)
-    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+    '''Лайк: переключает, а с action=like/unlike ставит или снимает.
+
+    Для AJAX-запросов отвечает JSON с новым числом лайков.
+    '''
+    post = get_object_or_404(Post.objects.only('pk'), id=pk)
+    liked = LIKE_ACTIONS.get(request.POST.get('action'))
+    liked, changed = post.set_like(request.user, liked)
+    if changed:
+        bump(POSTS)
+    if (request.is_ajax()
+            or 'application/json' in request.META.get('HTTP_ACCEPT', '')):
+        likes_count = Post.objects.values_list(
+            'likes_count', flat=True).get(pk=pk)
+        return JsonResponse({
+            'post_id': pk,
+            'liked': liked,
+            'likes_count': likes_count,
+        })
+    return redirect(
+        request.META.get('HTTP_REFERER')
+        or reverse('posts:post_detail', args=[pk])
+    )
+
+
+@require_safe
+def api_index(request):
+    '''Главная лента в JSON.'''
+    return api.feed_response(request, Post.objects.all())
+
+
+@require_safe
+def api_group_posts(request, slug):
+    '''Лента группы в JSON.'''
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True).first()
+    if group_id is None:
+        return api.error('Группа не найдена.', 404)
+    return api.feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+def api_profile(request, username):
+    '''Посты автора в JSON.'''
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True).first()
+    if author_id is None:
+        return api.error('Пользователь не найден.', 404)
+    return api.feed_response(
+        request, Post.objects.filter(author_id=author_id))
+
+
+@require_safe
+def api_follow_index(request):
+    '''Лента подписок в JSON.'''
+    if not request.user.is_authenticated:
+        return api.error('Нужна авторизация.', 401)
+    return api.feed_response(
+        request, timeline.timeline_for(request.user),
+        ordering=timeline.TIMELINE_ORDERING)
+
+
+@require_safe
+def api_post_detail(request, post_id):
+    '''Пост с комментариями в JSON.'''
+    return api.post_response(
+        request,
+        Post.objects.filter(pk=post_id),
+        Comment.objects.filter(post_id=post_id),
+    )
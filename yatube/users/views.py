@@ -1,6 +1,5 @@
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
-from django.core.mail import send_mail
 
 from .forms import CreationForm, ChangePassword, ResetPassword
 
@@ -21,12 +20,3 @@ class PassReser(CreateView):
     form_class = ResetPassword
     success_url = reverse_lazy('user:password_reset_done')
     template_name = 'users/password_reset_done.html'
-
-
-send_mail(
-    'Тема письма',
-    'Текст письма.',
-    'from@example.com',  # Это поле "От кого"
-    ['to@example.com'],  # Это поле "Кому" (можно указать список адресов)
-    fail_silently=False,  # Сообщать об ошибках («молчать ли об ошибках?»)
-)
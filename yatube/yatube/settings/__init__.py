@@ -0,0 +1,12 @@
+"""Настройки проекта.
+
+Профиль выбирается переменной окружения DJANGO_ENV: dev (по умолчанию)
+или prod. Общая часть — в base.py. Тесты запускаются с
+yatube.settings.test (pytest.ini, manage.py test).
+"""
+import os
+
+if os.getenv('DJANGO_ENV', 'dev') == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
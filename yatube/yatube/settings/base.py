@@ -0,0 +1,420 @@
+"""Общие настройки всех профилей (dev, prod).
+
+Всё, что отличается между окружениями, читается из переменных окружения;
+значения по умолчанию годятся для production, профиль dev их ослабляет.
+"""
+import copy
+import os
+import tempfile
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.getenv(
+    'DJANGO_SECRET_KEY', 'wvd12=t5vlt2s13-*!ljfe1(mqzyfohj@3x&y+rs&f^o*dc%%e')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+# При DEBUG Django ещё и копит в памяти каждый SQL-запрос.
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+    'www.Evstratov95.pythonanywhere.com',
+    'Evstratov95.pythonanywhere.com',
+]
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'sorl.thumbnail',
+    # 'debug_toolbar',
+]
+
+MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # 'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+# core.middleware.PerformanceMiddleware: доля измеряемых запросов (0–1)
+# и выдача замеров клиенту в заголовке Server-Timing.
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 1))
+
+PERFORMANCE_SERVER_TIMING = DEBUG
+
+# core.middleware.CompressionMiddleware: кодировки в порядке предпочтения
+# (brotli — только если установлен пакет brotli), порог размера ответа
+# в байтах и сжимаемые типы. Пустой список кодировок выключает сжатие.
+COMPRESSION_ENCODINGS = [
+    name.strip()
+    for name in os.getenv('COMPRESSION_ENCODINGS', 'br,gzip').split(',')
+    if name.strip()
+]
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 512))
+
+COMPRESSION_CONTENT_TYPES = [
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+]
+
+COMPRESSION_BROTLI_QUALITY = 5
+
+# core.streaming: отдавать ленты и страницу поста потоком (карточки по
+# мере рендера). ?stream=1 / ?stream=0 переопределяют настройку.
+STREAMING_RENDER = os.getenv('STREAMING_RENDER', 'False') == 'True'
+
+# core.querylog: статистика по отпечаткам SQL и журнал медленных запросов.
+# Включена в dev; в production — QUERY_LOG_ENABLED=True.
+QUERY_LOG_ENABLED = os.getenv('QUERY_LOG_ENABLED', 'False') == 'True'
+
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+
+QUERY_STATS_DIR = os.getenv(
+    'QUERY_STATS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube_query_stats')
+)
+
+QUERY_STATS_FLUSH_INTERVAL = 60
+
+# Сколько разных отпечатков хранит процесс; остальные идут в общую запись.
+QUERY_STATS_MAX_FINGERPRINTS = 1000
+
+# Строки JSON с замерами пишутся с уровнем INFO: чтобы их видеть,
+# запустите с PERFORMANCE_LOG_LEVEL=INFO.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'yatube.mail': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Кэширующий загрузчик разбирает каждый шаблон один раз на процесс
+# (core.templates). В разработке он выключен, чтобы правки шаблонов были
+# видны без перезапуска сервера.
+CACHED_TEMPLATES = os.getenv('CACHED_TEMPLATES', 'True') == 'True'
+
+# Разобрать все шаблоны при старте процесса (yatube/wsgi.py).
+TEMPLATE_WARMUP = CACHED_TEMPLATES
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if CACHED_TEMPLATES else TEMPLATE_LOADERS
+            ),
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# DB_ENGINE=sqlite (по умолчанию) или postgresql; параметры PostgreSQL —
+# DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('DB_USER', 'yatube'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+        }
+    }
+    # Пул соединений — PgBouncer перед базой (DB_POOLER=pgbouncer). В режиме
+    # pool_mode=transaction серверные курсоры между транзакциями не живут.
+    if os.getenv('DB_POOLER') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            # Сколько секунд ждать снятия блокировки записи.
+            'OPTIONS': {'timeout': 20},
+        }
+    }
+
+# Постоянные соединения: сколько секунд держать соединение между запросами
+# (0 — закрывать после каждого запроса, None — не закрывать).
+CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+
+DATABASES['default']['CONN_MAX_AGE'] = CONN_MAX_AGE
+
+# Реплики для чтения: DB_REPLICAS — через запятую хосты PostgreSQL или пути
+# к файлам SQLite. В тестах реплики смотрят в тестовую базу default.
+DATABASE_REPLICAS = []
+
+for number, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    replica = copy.deepcopy(DATABASES['default'])
+    replica['HOST' if DB_ENGINE == 'postgresql' else 'NAME'] = location.strip()
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{number}'] = replica
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Представления, которые читают с реплик (остальные — из default), и
+# сколько секунд после записи запросы того же браузера читают из default.
+REPLICA_READ_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:api_index',
+    'posts:api_group_list',
+    'posts:api_profile',
+    'posts:api_post_detail',
+    'posts:api_follow_index',
+}
+
+REPLICA_STICKY_COOKIE = 'db_primary'
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# PRAGMA для каждого нового соединения с SQLite (core.db): WAL не блокирует
+# чтение во время записи, synchronous=NORMAL в режиме WAL безопасен и
+# избавляет от fsync на каждый коммит; mmap_size в байтах, отрицательный
+# cache_size — в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME':
+        'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME':
+        'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME':
+        'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME':
+        'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [
+    os.path.join(BASE_DIR, 'static'),
+]
+
+POSTS_QUANTITY = 10
+
+# Комментариев на странице поста и в одной порции «Показать ещё».
+COMMENTS_QUANTITY = 20
+
+# Верхняя граница приблизительного подсчёта постов в ленте;
+# None отключает подсчёт (и лишний запрос на каждой странице).
+PAGINATOR_COUNT_LIMIT = None
+
+SYMBOLS_SLICE = 15
+
+# Лента подписок материализуется при публикации поста. Авторам, у которых
+# подписчиков больше FANOUT_FOLLOWERS_LIMIT, рассылка не делается: их посты
+# выбираются тем же запросом, что и лента, без записи. При подписке (и когда
+# автор перестаёт быть популярным) в ленту попадают последние
+# TIMELINE_BACKFILL_SIZE постов автора.
+FANOUT_FOLLOWERS_LIMIT = 5000
+
+TIMELINE_BACKFILL_SIZE = 200
+
+TIMELINE_BATCH_SIZE = 1000
+
+LOGIN_URL = 'users:login'
+
+LOGIN_REDIRECT_URL = 'posts:index'
+
+# Письма отправляет фоновый поток (core.mail): пачками по EMAIL_BATCH_SIZE
+# через EMAIL_DELIVERY_BACKEND, с EMAIL_RETRIES повторами через
+# EMAIL_RETRY_DELAY, 2 × EMAIL_RETRY_DELAY, ... секунд. При выходе процесс
+# ждёт отправки очереди не дольше EMAIL_SHUTDOWN_TIMEOUT секунд.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_BATCH_SIZE = 50
+
+EMAIL_RETRIES = 3
+
+EMAIL_RETRY_DELAY = 1
+
+EMAIL_SHUTDOWN_TIMEOUT = 10
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры картинок постов готовятся в фоне после сохранения поста
+# (posts.thumbnails); 0 потоков — готовить сразу, в том же запросе.
+THUMBNAIL_BACKEND = 'posts.thumbnail_backends.ThumbnailBackend'
+
+# Метаданные миниатюр sorl хранит в общем кэше CACHES['default'] (и в своей
+# таблице); страница ленты читает их одним get_many.
+THUMBNAIL_KVSTORE = 'posts.thumbnail_backends.KVStore'
+
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+THUMBNAIL_WORKERS = 2
+
+# Как часто процесс прибавляет свои счётчики миниатюр к общим (секунды).
+THUMBNAIL_STATS_FLUSH_INTERVAL = 60
+
+# Кэш общий для всех воркеров: по умолчанию файловый, для нескольких
+# машин — memcached (CACHE_BACKEND=memcached, CACHE_LOCATION=host:port),
+# locmem — только для разработки.
+CACHE_BACKENDS = {
+    'file': 'core.cache.FileBasedCache',
+    'memcached': 'core.cache.CompressedMemcachedCache',
+    'locmem': 'core.cache.CompressedLocMemCache',
+}
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'yatube_cache')
+        ),
+        'KEY_PREFIX': 'yatube',
+        'VERSION': int(os.getenv('CACHE_VERSION', 1)),
+        'OPTIONS': {},
+    }
+}
+
+if CACHE_BACKEND != 'file':
+    CACHES['default']['OPTIONS']['COMPRESS_MIN_LENGTH'] = 1024
+
+# Сколько секунд остальные запросы ждут, пока первый пересчитывает
+# страницу, которой нет в кэше.
+CACHE_STAMPEDE_LOCK_TIMEOUT = 5
+
+# Главная страница, карточки постов и список групп сбрасываются при
+# изменении данных (posts.cache), поэтому TTL может быть длинным.
+INDEX_CACHE_TIMEOUT = 60 * 60 * 6
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+GROUP_LINKS_CACHE_TIMEOUT = 60 * 60 * 24
+
+MAXIMUM_FIELD_LENGTH = 200
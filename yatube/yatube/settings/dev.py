@@ -0,0 +1,24 @@
+"""Разработка: отладка, шаблоны без кэша, соединения не держатся."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, TEMPLATE_LOADERS, TEMPLATES
+
+DEBUG = True
+
+PERFORMANCE_SERVER_TIMING = True
+
+QUERY_LOG_ENABLED = os.getenv('QUERY_LOG_ENABLED', 'True') == 'True'
+
+# Правки шаблонов видны без перезапуска сервера.
+CACHED_TEMPLATES = os.getenv('CACHED_TEMPLATES', 'False') == 'True'
+
+TEMPLATE_WARMUP = CACHED_TEMPLATES
+
+if not CACHED_TEMPLATES:
+    TEMPLATES[0]['OPTIONS']['loaders'] = TEMPLATE_LOADERS
+
+CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 0))
+
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = CONN_MAX_AGE
@@ -0,0 +1,15 @@
+"""Production: без отладки, с кэшем шаблонов и постоянными соединениями.
+
+Значения по умолчанию берутся из base.py; секретный ключ обязателен и
+задаётся в DJANGO_SECRET_KEY.
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+DEBUG = False
+
+# Замеряется каждый сотый запрос: этого хватает для статистики.
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 0.01))
@@ -0,0 +1,24 @@
+"""Тесты: настройки dev, свой кэш и каталог статистики на каждый прогон.
+
+Тесты чистят кэш (cache.clear()) и статистику запросов, поэтому кэш и
+QUERY_STATS_DIR сервера на той же машине они не трогают, что бы ни
+стояло в CACHE_BACKEND, CACHE_LOCATION и QUERY_STATS_DIR.
+"""
+import atexit
+import shutil
+import tempfile
+
+from .dev import *  # noqa: F401,F403
+from .base import CACHE_BACKENDS, CACHES
+
+CACHES['default'].update({
+    'BACKEND': CACHE_BACKENDS['file'],
+    'LOCATION': tempfile.mkdtemp(prefix='yatube_test_cache_'),
+    'KEY_PREFIX': 'yatube_test',
+    'OPTIONS': {},
+})
+
+QUERY_STATS_DIR = tempfile.mkdtemp(prefix='yatube_test_query_stats_')
+
+for directory in (CACHES['default']['LOCATION'], QUERY_STATS_DIR):
+    atexit.register(shutil.rmtree, directory, True)
@@ -1,8 +1,196 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import Paginator
 from django.conf import settings
+from django.db.models import Q
+
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по упорядоченному набору полей.
+
+    Страница выбирается условием `WHERE (pub_date, id) < (...)` вместо
+    `OFFSET`, поэтому тысячная страница стоит столько же, сколько первая,
+    а `COUNT(*)` по всей таблице не выполняется.
+
+    Возвращает обычный `Page` с дополнительными атрибутами `next_cursor`
+    и `previous_cursor`. Номер страницы едет внутри курсора, а `num_pages`
+    известен только в пределах просмотренного окна (текущая страница и,
+    если есть, следующая) — этого хватает `has_next`/`has_previous`.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 count_limit=None, **kwargs):
+        self.ordering = tuple(ordering)
+        self.count_limit = count_limit
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+
+    @property
+    def field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def encode_cursor(self, direction, number, obj):
+        values = []
+        for name in self.field_names:
+            # Строки .values() — словари, остальное — модели.
+            if isinstance(obj, dict):
+                value = obj[name]
+            else:
+                value = getattr(obj, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps([direction, number, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, номер, значения ключа) или None."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, number, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()).decode()
+            )
+            if direction not in (FORWARD, BACKWARD):
+                return None
+            number = max(int(number), 1)
+            if len(raw_values) != len(self.ordering):
+                return None
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.field_names, raw_values)
+            ]
+        except (TypeError, ValueError, OverflowError, binascii.Error,
+                FieldDoesNotExist, ValidationError):
+            return None
+        if None in values:
+            return None
+        return direction, number, values
+
+    def _keyset_filter(self, values, backward):
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != backward else 'gt'
+            step = Q(**{
+                f'{self.field_names[position]}__{lookup}': values[position]
+            })
+            for name, value in zip(
+                    self.field_names[:position], values[:position]):
+                step &= Q(**{name: value})
+            condition |= step
+        return condition
 
+    def _reversed_ordering(self):
+        return [
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        ]
 
-def paginate_posts(posts, page_number):
-    paginator = Paginator(posts, settings.POSTS_QUANTITY)
-    page_obj = paginator.get_page(page_number)
+    def get_cursor_page(self, cursor=None, page_number=None):
+        """Страница по курсору.
+
+        Без курсора отдаёт первую страницу; старые ссылки вида `?page=N`
+        продолжают работать через OFFSET, но дальше навигация идёт
+        только курсорами.
+        """
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            direction, number, values = decoded
+            if direction == BACKWARD:
+                return self._backward_page(number, values)
+            return self._forward_page(
+                self.object_list.filter(self._keyset_filter(values, False)),
+                number,
+            )
+        number = self._legacy_number(page_number)
+        offset = (number - 1) * self.per_page
+        return self._forward_page(self.object_list[offset:], number)
+
+    def _legacy_number(self, page_number):
+        try:
+            number = int(page_number)
+        except (TypeError, ValueError):
+            return 1
+        return max(number, 1)
+
+    def _forward_page(self, queryset, number):
+        rows = list(queryset[:self.per_page + 1])
+        items = rows[:self.per_page]
+        has_next = len(rows) > self.per_page
+        if not items:
+            number = 1
+        return self._cursor_page(items, number, has_next)
+
+    def _backward_page(self, number, values):
+        queryset = self.object_list.filter(
+            self._keyset_filter(values, True)
+        ).order_by(*self._reversed_ordering())
+        rows = list(queryset[:self.per_page + 1])
+        items = rows[:self.per_page][::-1]
+        if len(rows) <= self.per_page:
+            number = 1
+        else:
+            number = max(number, 2)
+        return self._cursor_page(items, number, has_next=bool(items))
+
+    def _cursor_page(self, items, number, has_next):
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(items, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if page.has_next():
+            page.next_cursor = self.encode_cursor(
+                FORWARD, number + 1, items[-1])
+        if page.has_previous() and items:
+            page.previous_cursor = self.encode_cursor(
+                BACKWARD, number - 1, items[0])
+        return page
+
+    @property
+    def approximate_count(self):
+        """Число объектов, посчитанное не дальше `count_limit`.
+
+        `COUNT(*)` по подзапросу с LIMIT ограничен по стоимости;
+        если лимит достигнут, результат означает «не меньше».
+        """
+        if not self.count_limit:
+            return None
+        if not hasattr(self, '_bounded_count'):
+            self._bounded_count = self.object_list.order_by()[
+                :self.count_limit + 1].count()
+        return min(self._bounded_count, self.count_limit)
+
+    @property
+    def approximate_count_is_capped(self):
+        if self.approximate_count is None:
+            return False
+        return self._bounded_count > self.count_limit
+
+
+def paginate_posts(posts, page_number, cursor=None,
+                   ordering=('-pub_date', '-id')):
+    paginator = CursorPaginator(
+        posts,
+        settings.POSTS_QUANTITY,
+        ordering=ordering,
+        count_limit=settings.PAGINATOR_COUNT_LIMIT,
+    )
+    page_obj = paginator.get_cursor_page(cursor, page_number)
     return page_obj
+
+
+def paginate_comments(comments, cursor=None):
+    paginator = CursorPaginator(
+        comments,
+        settings.COMMENTS_QUANTITY,
+        ordering=('created', 'id'),
+    )
+    return paginator.get_cursor_page(cursor)
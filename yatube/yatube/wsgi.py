@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.TEMPLATE_WARMUP:
+    from core import templates
+
+    _, _, errors = templates.warm()
+    if errors:
+        raise ImproperlyConfigured('Ошибки в шаблонах: ' + ', '.join(
+            f'{name}: {error}' for name, error in errors.items()))